@@ -7,19 +7,45 @@ Supports two targets:
 
 We intentionally keep formatting simple: title + paragraphs + bulleted lists.
 
-Auth: pulls Notion token from `openclaw config` skills.entries.notion.apiKey.
+Auth: uses $NOTION_TOKEN when set, else pulls the Notion token from `openclaw config`
+skills.entries.notion.apiKey (looked up once per process).
 """
 
 from __future__ import annotations
 
 import argparse
+import functools
+import gzip
+import http.client
 import json
 import os
 import re
 import subprocess
-import urllib.request
+import time
+from typing import Iterator
 
 NOTION_VERSION = "2025-09-03"
+NOTION_HOST = "api.notion.com"
+
+# Notion accepts at most 100 children per create/append request.
+MAX_CHILDREN = 100
+# Statuses worth retrying. Writes (POST/PATCH) only retry ones that mean "not applied":
+# a 500/502/504 may come after Notion already created the page / appended the blocks.
+RETRY_STATUS = {429, 500, 502, 503, 504}
+RETRY_STATUS_WRITE = {429, 503}
+
+_CONN: http.client.HTTPSConnection | None = None
+
+try:
+    import orjson  # type: ignore
+except ModuleNotFoundError:  # optional: stdlib json fallback
+    orjson = None
+
+
+def _dumps(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode("utf-8")
 
 
 def _run(cmd: list[str]) -> str:
@@ -29,41 +55,118 @@ def _run(cmd: list[str]) -> str:
     return p.stdout
 
 
+@functools.lru_cache(maxsize=1)
 def notion_token() -> str:
+    env = os.environ.get("NOTION_TOKEN")
+    if env:
+        return env.strip()
     raw = _run(["openclaw", "config", "get", "skills.entries.notion.apiKey", "--json"]).strip()
     return raw.strip().strip('"')
 
 
+def _conn() -> http.client.HTTPSConnection:
+    # One keep-alive connection per process: multi-batch publishes skip repeated TLS handshakes.
+    # Requests are strictly sequential (append order matters), so HTTP/2 multiplexing would not
+    # add anything over this and is not worth a third-party client.
+    global _CONN
+    if _CONN is None:
+        _CONN = http.client.HTTPSConnection(NOTION_HOST, timeout=30)
+    return _CONN
+
+
+def _reset_conn() -> None:
+    global _CONN
+    if _CONN is not None:
+        _CONN.close()
+    _CONN = None
+
+
+def _retry_after(resp: http.client.HTTPResponse) -> float | None:
+    # Notion sends Retry-After in seconds (the HTTP-date form is not used).
+    try:
+        return max(0.0, float(resp.getheader("Retry-After", "")))
+    except ValueError:
+        return None
+
+
 def req(method: str, path: str, token: str, payload: dict | None = None) -> dict:
-    url = "https://api.notion.com/v1" + path
     data = None
     if payload is not None:
-        data = json.dumps(payload).encode("utf-8")
-    r = urllib.request.Request(url, data=data, method=method)
-    r.add_header("Authorization", f"Bearer {token}")
-    r.add_header("Notion-Version", NOTION_VERSION)
-    r.add_header("Content-Type", "application/json")
-    with urllib.request.urlopen(r) as resp:
-        return json.loads(resp.read().decode("utf-8"))
+        data = _dumps(payload)
+    headers = {
+        "Authorization": f"Bearer {token}",
+        "Notion-Version": NOTION_VERSION,
+        "Content-Type": "application/json",
+        "Accept-Encoding": "gzip",
+    }
+    retry_status = RETRY_STATUS if method == "GET" else RETRY_STATUS_WRITE
+    for attempt in range(5):
+        last = attempt == 4
+        conn = _conn()
+        # An open socket here means a keep-alive connection left over from an earlier request.
+        reused = conn.sock is not None
+        try:
+            conn.request(method, "/v1" + path, body=data, headers=headers)
+            resp = conn.getresponse()
+            body = resp.read()
+        except (BrokenPipeError, ConnectionResetError):
+            # RemoteDisconnected is a ConnectionResetError too.
+            _reset_conn()
+            if not reused or last:
+                raise
+            # Server dropped the idle keep-alive connection before reading the request; reconnect and retry.
+            continue
+        except (http.client.HTTPException, OSError):
+            # Timeouts etc. may fire after Notion applied the request: POST /pages and
+            # PATCH .../children are not idempotent, so never resend them.
+            _reset_conn()
+            raise
+
+        if resp.getheader("Content-Encoding", "").lower() == "gzip":
+            body = gzip.decompress(body)
+
+        # Back off on rate limits / transient server errors, as long as Notion asks for.
+        if resp.status in retry_status and not last:
+            time.sleep(_retry_after(resp) or 2**attempt)
+            continue
+        if resp.status >= 400:
+            raise RuntimeError(f"Notion {method} {path} failed: HTTP {resp.status}: {body[:500].decode('utf-8', 'replace')}")
+        return json.loads(body.decode("utf-8"))
+    raise RuntimeError("unreachable")
 
 
-def md_to_blocks(md: str) -> list[dict]:
-    blocks: list[dict] = []
+def chunk_list(lst: list, n: int) -> list[list]:
+    return [lst[i : i + n] for i in range(0, len(lst), n)]
+
+
+# Markdown line prefix -> Notion block type ("# " is the page title and is skipped).
+_LINE_RE = re.compile(r"^(# |## |- )?(.*)$")
+_PREFIX_TYPES = {
+    "## ": "heading_2",
+    "- ": "bulleted_list_item",
+    None: "paragraph",
+}
+
+
+def _text_block(t: str, content: str) -> dict:
+    # Fresh dict per block: built once and serialized once by req(), so no copying needed.
+    return {"object": "block", "type": t, t: {"rich_text": [{"type": "text", "text": {"content": content}}]}}
+
+
+def iter_blocks(md: str) -> Iterator[dict]:
     for line in md.splitlines():
         line = line.rstrip()
         if not line.strip():
             continue
-        if line.startswith("# "):
+        prefix, content = _LINE_RE.match(line).groups()
+        if prefix == "# ":
             # ignore title here; handled as page title
             continue
-        if line.startswith("## "):
-            blocks.append({"object": "block", "type": "heading_2", "heading_2": {"rich_text": [{"type": "text", "text": {"content": line[3:].strip()}}]}})
-            continue
-        if line.startswith("- "):
-            blocks.append({"object": "block", "type": "bulleted_list_item", "bulleted_list_item": {"rich_text": [{"type": "text", "text": {"content": line[2:].strip()}}]}})
-            continue
-        blocks.append({"object": "block", "type": "paragraph", "paragraph": {"rich_text": [{"type": "text", "text": {"content": line}}]}})
-    return blocks
+        yield _text_block(_PREFIX_TYPES[prefix], content.strip() if prefix else content)
+
+
+def md_to_blocks(md: str) -> list[dict]:
+    return list(iter_blocks(md))
 
 
 def extract_title(md: str, fallback: str) -> str:
@@ -104,7 +207,7 @@ def main() -> int:
             "properties": {
                 args.property: {"title": [{"type": "text", "text": {"content": title}}]}
             },
-            "children": blocks[:90],
+            "children": blocks[:MAX_CHILDREN],
         }
     else:
         pid = normalize_id(args.parent_page_id)
@@ -113,10 +216,15 @@ def main() -> int:
             "properties": {
                 "title": {"title": [{"type": "text", "text": {"content": title}}]}
             },
-            "children": blocks[:90],
+            "children": blocks[:MAX_CHILDREN],
         }
 
     created = req("POST", "/pages", token, payload)
+
+    # Append the rest in order; Notion appends to the end of the page, so batches
+    # must be sent one after another to keep the story readable.
+    for batch in chunk_list(blocks[MAX_CHILDREN:], MAX_CHILDREN):
+        req("PATCH", f"/blocks/{created['id']}/children", token, {"children": batch})
     print(created.get("url", ""))
     return 0
 
@@ -13,6 +13,7 @@ The OpenClaw agent should run this script, then write the final story, then publ
 from __future__ import annotations
 
 import argparse
+import hashlib
 import json
 from datetime import datetime
 from pathlib import Path
@@ -22,14 +23,16 @@ from story_db import connect, ensure_run, ensure_words, select_words, mark_used
 
 def load_words(path: Path) -> list[str]:
     raw = path.read_text(encoding="utf-8").splitlines()
-    words = []
+    words: list[str] = []
+    seen: set[str] = set()
     for w in raw:
         w = w.strip()
         if not w or w.startswith("#"):
             continue
         # strip quotes
         w = w.strip('"')
-        if w and w not in words:
+        if w and w not in seen:
+            seen.add(w)
             words.append(w)
     return words
 
@@ -56,45 +59,64 @@ def main() -> int:
     if len(words) < 50:
         raise SystemExit(f"words file looks too small: {words_file} ({len(words)} words)")
 
-    conn = connect(db_path)
-    current_run = ensure_run(conn, run_date=today_iso)
-
-    ensure_words(conn, words, today_iso=today_iso, current_run=current_run)
-
-    chosen = select_words(conn, current_run=current_run, due=args.due, new=args.new)
-    # mark used now (we assume the story will use them)
-    mark_used(conn, chosen, today_iso=today_iso, current_run=current_run)
-
-    meta = {
-        "generated_at": now.isoformat(),
-        "date": today_iso,
-        "run_id": current_run,
-        "target_words": chosen,
-        "minutes": args.minutes,
-    }
-
     meta_path = out_dir / f"{today_iso}-meta.json"
-    meta_path.write_text(json.dumps(meta, ensure_ascii=False, indent=2), encoding="utf-8")
+    meta = None
+    if meta_path.exists():
+        # Same-day retry: today's words were already selected and marked used, so reuse
+        # them (and the minutes) instead of spending another set on a new stub.
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        if meta.get("date") != today_iso or not meta.get("target_words"):
+            meta = None
+
+    if meta is None:
+        conn = connect(db_path)
+        # One transaction (one commit/fsync) for the whole selection step.
+        with conn:
+            current_run = ensure_run(conn, run_date=today_iso, commit=False)
+
+            ensure_words(conn, words, today_iso=today_iso, current_run=current_run, commit=False)
+
+            chosen = select_words(conn, current_run=current_run, due=args.due, new=args.new)
+            # mark used now (we assume the story will use them)
+            mark_used(conn, chosen, today_iso=today_iso, current_run=current_run, commit=False)
+
+        # Depends only on the words and minutes (no timestamps), so downstream caches can key on it.
+        prompt_hash = hashlib.sha256(("|".join(sorted(chosen)) + f"|{args.minutes}").encode("utf-8")).hexdigest()[:12]
+
+        meta = {
+            "generated_at": now.isoformat(),
+            "date": today_iso,
+            "run_id": current_run,
+            "target_words": chosen,
+            "minutes": args.minutes,
+            "prompt_hash": prompt_hash,
+        }
+        meta_path.write_text(json.dumps(meta, ensure_ascii=False, indent=2), encoding="utf-8")
+    else:
+        chosen = meta["target_words"]
+        prompt_hash = meta["prompt_hash"]
 
     # The agent will turn this into the final story.
-    stub_md = out_dir / f"{today_iso}-story.md"
-    stub_md.write_text(
-        "# História bilíngue — Tico e Nino\n\n"
-        f"(Gerado em {now.isoformat()})\n\n"
-        "**Palavras de hoje (inglês):** "
-        + ", ".join(chosen)
-        + "\n\n"
-        "---\n\n"
-        "(A ser escrito pelo agente a partir do prompt gerado.)\n\n"
-        "## Prática rápida\n\n"
-        "(5 prompts curtos)\n\n"
-        "## Glossário\n\n"
-        "(1 item por palavra: frase em inglês + pronúncia + tradução/ideia)\n\n"
-        "## Palavras de hoje\n\n"
-        + "\n".join([f"- {w}" for w in chosen])
-        + "\n",
-        encoding="utf-8",
-    )
+    stub_md = out_dir / f"{today_iso}-{prompt_hash}-story.md"
+    # Same words/minutes already stubbed (or already written by the agent): keep it.
+    if not stub_md.exists():
+        stub_md.write_text(
+            "# História bilíngue — Tico e Nino\n\n"
+            f"(Gerado em {today_iso})\n\n"
+            "**Palavras de hoje (inglês):** "
+            + ", ".join(chosen)
+            + "\n\n"
+            "---\n\n"
+            "(A ser escrito pelo agente a partir do prompt gerado.)\n\n"
+            "## Prática rápida\n\n"
+            "(5 prompts curtos)\n\n"
+            "## Glossário\n\n"
+            "(1 item por palavra: frase em inglês + pronúncia + tradução/ideia)\n\n"
+            "## Palavras de hoje\n\n"
+            + "\n".join([f"- {w}" for w in chosen])
+            + "\n",
+            encoding="utf-8",
+        )
 
     print(json.dumps({"meta": str(meta_path), "stub": str(stub_md), "target_words": chosen}, ensure_ascii=False))
     return 0
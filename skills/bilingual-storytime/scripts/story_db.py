@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 from __future__ import annotations
 
+import random
 import sqlite3
 from dataclasses import dataclass
 from datetime import datetime
@@ -42,6 +43,14 @@ CREATE TABLE IF NOT EXISTS stories (
 );
 """
 
+# Applied after the column migration in connect(): older DBs lack next_due_run until then.
+INDEX_SQL = """
+-- select_words: due words ordered by (times_used, box).
+CREATE INDEX IF NOT EXISTS idx_words_due ON words(next_due_run, times_used, box);
+-- select_words: never-used words.
+CREATE INDEX IF NOT EXISTS idx_words_new ON words(times_used) WHERE times_used = 0;
+"""
+
 # Leitner-like intervals measured in *number of runs*.
 # Example (weekly schedule): box 1 -> due next run; box 2 -> +2 runs; box 3 -> +4 runs...
 INTERVAL_RUNS = {1: 1, 2: 2, 3: 4, 4: 8, 5: 16}
@@ -61,6 +70,10 @@ def connect(db_path: str | Path) -> sqlite3.Connection:
     p.parent.mkdir(parents=True, exist_ok=True)
     conn = sqlite3.connect(str(p))
     conn.row_factory = sqlite3.Row
+    # WAL + NORMAL sync: one cheap fsync per commit instead of a full journal rewrite.
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
     conn.executescript(SCHEMA_SQL)
 
     # Lightweight migration: ensure new run-based columns exist even for older DBs.
@@ -76,10 +89,12 @@ def connect(db_path: str | Path) -> sqlite3.Connection:
     cur.execute("UPDATE words SET next_due_run=1 WHERE next_due_run IS NULL")
     conn.commit()
 
+    conn.executescript(INDEX_SQL)
+
     return conn
 
 
-def ensure_run(conn: sqlite3.Connection, run_date: str) -> int:
+def ensure_run(conn: sqlite3.Connection, run_date: str, commit: bool = True) -> int:
     """Get (or create) the run_id for a given ISO date (YYYY-MM-DD)."""
     cur = conn.cursor()
     existing = cur.execute("SELECT run_id FROM runs WHERE run_date=?", (run_date,)).fetchone()
@@ -88,50 +103,72 @@ def ensure_run(conn: sqlite3.Connection, run_date: str) -> int:
 
     now = datetime.now().astimezone().isoformat()
     cur.execute("INSERT INTO runs(run_date, created_at) VALUES(?, ?)", (run_date, now))
-    conn.commit()
+    if commit:
+        conn.commit()
     return int(cur.lastrowid)
 
 
-def ensure_words(conn: sqlite3.Connection, words: Iterable[str], today_iso: str, current_run: int) -> None:
-    cur = conn.cursor()
-    for w in words:
-        w = w.strip()
-        if not w:
-            continue
-        # New words start due on the *next run*.
-        # We keep legacy next_due/last_used filled for human readability, but use next_due_run.
-        cur.execute(
-            "INSERT OR IGNORE INTO words(word, box, next_due, last_used, next_due_run, last_used_run, times_used) "
-            "VALUES(?, 1, ?, NULL, ?, NULL, 0)",
-            (w, today_iso, current_run + 1),
-        )
-    conn.commit()
+def ensure_words(
+    conn: sqlite3.Connection, words: Iterable[str], today_iso: str, current_run: int, commit: bool = True
+) -> None:
+    # New words start due on the *next run*.
+    # We keep legacy next_due/last_used filled for human readability, but use next_due_run.
+    rows = [(w, today_iso, current_run + 1) for w in (w.strip() for w in words) if w]
+    # executemany opens a single implicit transaction.
+    conn.executemany(
+        "INSERT OR IGNORE INTO words(word, box, next_due, last_used, next_due_run, last_used_run, times_used) "
+        "VALUES(?, 1, ?, NULL, ?, NULL, 0)",
+        rows,
+    )
+    if commit:
+        conn.commit()
+
+
+def _lowest_words(cur: sqlite3.Cursor, where: str, params: tuple, n: int) -> list[str]:
+    """Pick n words with the lowest (times_used, box), breaking ties at random.
+
+    Same result as `ORDER BY times_used, box, RANDOM() LIMIT n`, but only the boundary
+    (times_used, box) bucket is shuffled in Python instead of calling RANDOM() per row.
+    """
+    if n <= 0:
+        return []
+    rows = cur.execute(
+        f"SELECT word, times_used, box FROM words WHERE {where} ORDER BY times_used ASC, box ASC LIMIT ?",
+        (*params, n),
+    ).fetchall()
+    if not rows:
+        return []
+
+    last_tu, last_box = rows[-1]["times_used"], rows[-1]["box"]
+    out = [r["word"] for r in rows if (r["times_used"], r["box"]) != (last_tu, last_box)]
+    bucket = [
+        r["word"]
+        for r in cur.execute(
+            f"SELECT word FROM words WHERE {where} AND times_used = ? AND box = ?",
+            (*params, last_tu, last_box),
+        ).fetchall()
+    ]
+    out.extend(random.sample(bucket, min(len(bucket), n - len(out))))
+    return out
 
 
 def select_words(conn: sqlite3.Connection, current_run: int, due: int, new: int) -> list[str]:
     cur = conn.cursor()
 
-    due_rows = cur.execute(
-        "SELECT word FROM words WHERE next_due_run <= ? ORDER BY times_used ASC, box ASC, RANDOM() LIMIT ?",
-        (current_run, due),
-    ).fetchall()
-    due_words = [r["word"] for r in due_rows]
+    due_words = _lowest_words(cur, "next_due_run <= ?", (current_run,), due)
 
-    new_rows = cur.execute(
-        "SELECT word FROM words WHERE times_used = 0 ORDER BY RANDOM() LIMIT ?",
-        (new,),
-    ).fetchall()
-    new_words = [r["word"] for r in new_rows]
+    new_words: list[str] = []
+    if new > 0:
+        # Only `new` rows come back; the WHERE is served by the partial index idx_words_new.
+        new_words = [
+            r["word"]
+            for r in cur.execute("SELECT word FROM words WHERE times_used = 0 ORDER BY random() LIMIT ?", (new,))
+        ]
 
     # If not enough due words, top up with least-used.
     need = max(0, (due + new) - (len(due_words) + len(new_words)))
     if need:
-        more = cur.execute(
-            "SELECT word FROM words ORDER BY times_used ASC, box ASC, RANDOM() LIMIT ?",
-            (need,),
-        ).fetchall()
-        for r in more:
-            w = r["word"]
+        for w in _lowest_words(cur, "1 = 1", (), need):
             if w not in due_words and w not in new_words:
                 due_words.append(w)
 
@@ -143,30 +180,40 @@ def select_words(conn: sqlite3.Connection, current_run: int, due: int, new: int)
     return out[: (due + new)]
 
 
-def mark_used(conn: sqlite3.Connection, words: list[str], today_iso: str, current_run: int) -> None:
+def mark_used(
+    conn: sqlite3.Connection, words: list[str], today_iso: str, current_run: int, commit: bool = True
+) -> None:
+    if not words:
+        return
     cur = conn.cursor()
-    for w in words:
-        row = cur.execute("SELECT box, times_used FROM words WHERE word=?", (w,)).fetchone()
-        if not row:
-            continue
-        box = int(row[0])
-        times_used = int(row[1])
-        next_box = min(5, box + 1)
-        interval_runs = INTERVAL_RUNS.get(next_box, 4)
+    placeholders = ",".join("?" * len(words))
+    rows = cur.execute(
+        f"SELECT word, box, times_used FROM words WHERE word IN ({placeholders})",
+        list(words),
+    ).fetchall()
 
+    params = []
+    for r in rows:
+        next_box = min(5, int(r["box"]) + 1)
+        interval_runs = INTERVAL_RUNS.get(next_box, 4)
         # Maintain both legacy (date-based) and new (run-based) fields.
-        cur.execute(
-            "UPDATE words "
-            "SET box=?, times_used=?, last_used=?, next_due=?, last_used_run=?, next_due_run=? "
-            "WHERE word=?",
+        params.append(
             (
                 next_box,
-                times_used + 1,
+                int(r["times_used"]) + 1,
                 today_iso,
                 today_iso,  # legacy: informational only
                 current_run,
                 current_run + interval_runs,
-                w,
-            ),
+                r["word"],
+            )
         )
-    conn.commit()
+
+    cur.executemany(
+        "UPDATE words "
+        "SET box=?, times_used=?, last_used=?, next_due=?, last_used_run=?, next_due_run=? "
+        "WHERE word=?",
+        params,
+    )
+    if commit:
+        conn.commit()
@@ -65,3 +65,25 @@ CREATE TABLE IF NOT EXISTS statement_items (
 
 CREATE INDEX IF NOT EXISTS idx_statement_items_statement_id ON statement_items(statement_id);
 CREATE INDEX IF NOT EXISTS idx_statement_items_fingerprint ON statement_items(fingerprint);
+-- Spend reports: equality filters (kind, direction) first, then the posted_at range;
+-- statement_id/category/amount_minor make it covering (no table lookups).
+CREATE INDEX IF NOT EXISTS idx_statement_items_kind_dir_posted ON statement_items(kind, direction, posted_at, statement_id, category, amount_minor);
+-- Idempotency: an item appears once per statement (identical lines get an occurrence suffix).
+-- Migration for databases written before the index existed, where identical lines shared a
+-- fingerprint: suffix the 2nd, 3rd, ... copy with #1, #2, ... as insert_sqlite does. No-op
+-- (constant check) once the index is in place.
+UPDATE statement_items
+SET fingerprint = fingerprint || '#' || (
+  SELECT COUNT(*) FROM statement_items AS prev
+  WHERE prev.statement_id = statement_items.statement_id
+    AND prev.fingerprint = statement_items.fingerprint
+    AND prev.rowid < statement_items.rowid
+)
+WHERE NOT EXISTS (SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'uidx_statement_items_statement_fp')
+  AND EXISTS (
+    SELECT 1 FROM statement_items AS prev
+    WHERE prev.statement_id = statement_items.statement_id
+      AND prev.fingerprint = statement_items.fingerprint
+      AND prev.rowid < statement_items.rowid
+  );
+CREATE UNIQUE INDEX IF NOT EXISTS uidx_statement_items_statement_fp ON statement_items(statement_id, fingerprint);
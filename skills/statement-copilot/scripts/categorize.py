@@ -7,17 +7,30 @@ Uses OpenClaw model engine via `openclaw agent --json`.
 
 Design:
 - Controlled taxonomy (small set of categories).
-- Batch classification to reduce tokens.
+- Batch classification to reduce tokens; batches run concurrently (subprocess + LLM wait is I/O-bound).
 - Safe defaults: unknown -> "other".
+- LLM answers are cached on disk (keyed by description/kind/direction) so re-runs skip the LLM.
 """
 
 from __future__ import annotations
 
 import argparse
+import contextlib
+import functools
+import hashlib
 import json
+import re
+import shutil
+import sqlite3
 import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+from db import workspace_dir
+from jsonio import dumps_bytes, loads_bytes
+
 
 CATEGORIES = [
     "groceries",
@@ -43,10 +56,24 @@ SYSTEM = (
     "Return ONLY JSON."
 )
 
+# Fixed parts of the classification prompt, built once per process.
+PROMPT_PREFIX = f"{SYSTEM}\n\nAllowed categories: [{', '.join(CATEGORIES)}]\n\nInput: "
+PROMPT_SUFFIX = '\n\nReturn JSON array of same length, each element: {"idx": <idx>, "category": <one of allowed>}'
+
+# Models often wrap JSON in ```json fences; strip them before giving up on a reply.
+FENCE_RE = re.compile(r"^```(?:json)?\s*|\s*```$")
+LLM_ATTEMPTS = 3
+
+
+@functools.lru_cache(maxsize=1)
+def openclaw_bin() -> str:
+    # Resolve once; concurrent batches then spawn the CLI without re-walking PATH.
+    return shutil.which("openclaw") or "openclaw"
+
 
 def run_agent(message: str, session_id: str) -> str:
     cmd = [
-        "openclaw",
+        openclaw_bin(),
         "agent",
         "--json",
         "--thinking",
@@ -68,129 +95,189 @@ def run_agent(message: str, session_id: str) -> str:
     return json.dumps(data)
 
 
-def chunk(lst: list[dict], n: int) -> list[list[dict]]:
+def chunk(lst: list, n: int) -> list[list]:
     return [lst[i : i + n] for i in range(0, len(lst), n)]
 
 
+# Description prefix -> category (deterministic, checked before the LLM).
+HEURISTIC_PREFIXES = {
+    # Shopping
+    "AMAZON": "shopping",
+    "SHOPEE": "shopping",
+    "MERCADOLIVRE": "shopping",
+    "AMERICANAS": "shopping",
+    "MAGALU": "shopping",
+    "KABUM": "shopping",
+    "ALIEXPRESS": "shopping",
+    # Delivery
+    "IFOOD": "delivery",
+    "IFD*": "delivery",
+    "IFD ": "delivery",
+    "RAPPI": "delivery",
+    # Transport
+    "UBER": "transport",
+    "99": "transport",
+    "ALLPARK": "transport",
+    # Fuel
+    "POSTO": "fuel",
+    # Restaurants
+    "RESTAURANTE": "restaurants",
+    "CHURRASC": "restaurants",
+    # Entertainment
+    "CINEMARK": "entertainment",
+    "SPOTIFY": "entertainment",
+    # Subscriptions / Streaming
+    "NETFLIX": "subscriptions",
+    "DISNEY": "subscriptions",
+    "PRIMEVIDEO": "subscriptions",
+    # Health
+    "DROGASIL": "health",
+    "DROGARIA": "health",
+}
+
+# One dict probe per distinct prefix length instead of a startswith per prefix.
+_PREFIX_LENGTHS = sorted({len(p) for p in HEURISTIC_PREFIXES})
+
+
 def heuristic_category(description: str | None) -> str | None:
     if not description:
         return None
     d = description.strip().upper()
+    for n in _PREFIX_LENGTHS:
+        cat = HEURISTIC_PREFIXES.get(d[:n])
+        if cat:
+            return cat
+    return None
 
-    # Shopping
-    if d.startswith("AMAZON") or d.startswith("SHOPEE") or d.startswith("MERCADOLIVRE"):
-        return "shopping"
-    if d.startswith("AMERICANAS") or d.startswith("MAGALU") or d.startswith("KABUM") or d.startswith("ALIEXPRESS"):
-        return "shopping"
-
-    # Delivery
-    if d.startswith("IFOOD") or d.startswith("IFD*") or d.startswith("IFD "):
-        return "delivery"
-    if d.startswith("RAPPI"):
-        return "delivery"
 
-    # Transport
-    if d.startswith("UBER") or d.startswith("99") or d.startswith("ALLPARK"):
-        return "transport"
+def cache_path() -> Path:
+    return workspace_dir() / "data" / "statement-copilot" / "category_cache.sqlite"
 
-    # Fuel
-    if d.startswith("POSTO"):
-        return "fuel"
 
-    # Restaurants
-    if d.startswith("RESTAURANTE") or d.startswith("CHURRASC"):
-        return "restaurants"
+def cache_key(it: dict) -> str:
+    raw = f"{it.get('description_raw') or ''}|{it.get('kind') or ''}|{it.get('direction') or ''}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
 
-    # Entertainment
-    if d.startswith("CINEMARK") or d.startswith("SPOTIFY"):
-        return "entertainment"
 
-    # Subscriptions / Streaming
-    if d.startswith("NETFLIX") or d.startswith("DISNEY") or d.startswith("PRIMEVIDEO"):
-        return "subscriptions"
+def open_cache() -> sqlite3.Connection:
+    p = cache_path()
+    p.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(p)
+    conn.execute("CREATE TABLE IF NOT EXISTS category_cache (key TEXT PRIMARY KEY, category TEXT NOT NULL)")
+    return conn
 
-    # Health
-    if d.startswith("DROGASIL") or d.startswith("DROGARIA"):
-        return "health"
 
+def parse_json_reply(raw: str):
+    """Parse a model reply as JSON, tolerating ```json fences. Returns None if unparseable."""
+    for candidate in (raw, FENCE_RE.sub("", raw.strip())):
+        try:
+            return json.loads(candidate)
+        except json.JSONDecodeError:
+            pass
     return None
 
 
-def main() -> int:
+def classify_batch(batch: list[dict], session_id: str) -> list[str] | None:
+    """Ask the LLM for one category per item; returns categories in input order.
+
+    Retries malformed replies with backoff; returns None if every attempt fails.
+    """
+
+    todo = [
+        {
+            "idx": i,
+            "posted_at": it.get("posted_at"),
+            "description": it.get("description_raw"),
+            "kind": it.get("kind"),
+            "direction": it.get("direction"),
+            "amount_minor": it.get("amount_minor"),
+            "currency": it.get("currency"),
+        }
+        for i, it in enumerate(batch)
+    ]
+    prompt = PROMPT_PREFIX + dumps_bytes(todo).decode("utf-8") + PROMPT_SUFFIX
+
+    cats = None
+    for attempt in range(LLM_ATTEMPTS):
+        if attempt:
+            time.sleep(2**attempt)
+        raw = run_agent(prompt, session_id=session_id)
+        cats = parse_json_reply(raw)
+        if isinstance(cats, list) and len(cats) == len(todo):
+            break
+        print(f"WARN: bad categorization reply (attempt {attempt + 1}/{LLM_ATTEMPTS}): {raw[:200]}", file=sys.stderr)
+    else:
+        # Give up on this batch only; the caller falls back to "other" so the pipeline finishes.
+        return None
+
+    out: list[str] = []
+    for c in cats:
+        cat = (c or {}).get("category")
+        if cat not in CATEGORIES:
+            cat = "other"
+        out.append(cat)
+    return out
+
+
+def main(argv: list[str] | None = None) -> int:
     ap = argparse.ArgumentParser()
     ap.add_argument("--in", dest="in_path", required=True, help="Input parsed JSON")
     ap.add_argument("--out", dest="out_path", required=True, help="Output JSON with categories")
     ap.add_argument("--issuer", required=True)
     ap.add_argument("--batch", type=int, default=30)
-    args = ap.parse_args()
+    ap.add_argument("--workers", type=int, default=8, help="Max LLM batches in flight")
+    ap.add_argument("--no-cache", action="store_true", help="Ignore the on-disk category cache")
+    args = ap.parse_args(argv)
 
-    doc = json.loads(Path(args.in_path).read_text(encoding="utf-8"))
+    doc = loads_bytes(Path(args.in_path).read_bytes())
     st = doc.get("statement")
     items = st.get("items") if isinstance(st, dict) else None
     if not isinstance(items, list):
         raise SystemExit("Invalid input: statement.items must be a list")
 
-    session_id = f"statement-copilot-cat-{args.issuer}"
-
-    allowed = ", ".join(CATEGORIES)
-
-    out_items: list[dict] = []
-    for b in chunk(items, args.batch):
-        # Pre-assign with heuristics; LLM classifies only the remaining ones.
-        fixed: dict[int, str] = {}
-        todo: list[dict] = []
-        for i, it in enumerate(b):
-            hcat = heuristic_category(it.get("description_raw"))
-            if hcat:
-                fixed[i] = hcat
-            else:
-                todo.append(
-                    {
-                        "idx": i,
-                        "posted_at": it.get("posted_at"),
-                        "description": it.get("description_raw"),
-                        "kind": it.get("kind"),
-                        "direction": it.get("direction"),
-                        "amount_minor": it.get("amount_minor"),
-                        "currency": it.get("currency"),
-                    }
-                )
-
-        cats_map: dict[int, str] = {}
-        if todo:
-            prompt = (
-                SYSTEM
-                + "\n\nAllowed categories: ["
-                + allowed
-                + "]\n\nInput: "
-                + json.dumps(todo, ensure_ascii=False)
-                + "\n\nReturn JSON array of same length, each element: {\"idx\": <idx>, \"category\": <one of allowed>}"
-            )
+    # Repeated merchants across statements skip the LLM via a description-keyed cache.
+    cache: dict[str, str] = {}
+    if not args.no_cache:
+        with contextlib.closing(open_cache()) as cconn:
+            cache = dict(cconn.execute("SELECT key, category FROM category_cache").fetchall())
 
-            raw = run_agent(prompt, session_id=session_id)
-            try:
-                cats = json.loads(raw)
-            except Exception:
-                raise SystemExit(f"Categorization returned non-JSON: {raw[:200]}")
-
-            if not isinstance(cats, list) or len(cats) != len(todo):
-                raise SystemExit("Categorization output length mismatch")
-
-            for j, c in enumerate(cats):
-                idx = todo[j]["idx"]
-                cat = (c or {}).get("category")
-                if cat not in CATEGORIES:
-                    cat = "other"
-                cats_map[idx] = cat
-
-        # apply
-        for j, it in enumerate(b):
-            it["category"] = fixed.get(j) or cats_map.get(j) or "other"
-            out_items.append(it)
-
-    st["items"] = out_items
-    Path(args.out_path).write_text(json.dumps(doc, ensure_ascii=False), encoding="utf-8")
-    print(f"OK: categorized {len(out_items)} items")
+    # Single pass of heuristics / cache over all items; only the leftovers are batched for the LLM,
+    # so batches are never padded with items we already know.
+    cats: list[str | None] = [
+        heuristic_category(it.get("description_raw")) or cache.get(cache_key(it)) for it in items
+    ]
+    todo_positions = [i for i, c in enumerate(cats) if c is None]
+    batches = chunk(todo_positions, args.batch)
+    # One session per batch so OpenClaw doesn't serialize concurrent requests on a shared session.
+    session_prefix = f"statement-copilot-cat-{args.issuer}"
+
+    learned: dict[str, str] = {}
+    if batches:
+        workers = max(1, min(args.workers, len(batches)))
+        with ThreadPoolExecutor(max_workers=workers) as ex:
+            # map() yields results in submission order, so they line up with `batches`.
+            results = ex.map(
+                lambda ib: classify_batch([items[i] for i in ib[1]], f"{session_prefix}-{ib[0]}"),
+                enumerate(batches),
+            )
+            for positions, batch_cats in zip(batches, results):
+                if batch_cats is None:
+                    continue  # left as None -> "other", and not cached
+                for i, cat in zip(positions, batch_cats):
+                    cats[i] = cat
+                    learned[cache_key(items[i])] = cat
+
+    if learned and not args.no_cache:
+        with contextlib.closing(open_cache()) as cconn:
+            cconn.executemany("INSERT OR REPLACE INTO category_cache (key, category) VALUES (?, ?)", learned.items())
+            cconn.commit()
+
+    for it, cat in zip(items, cats):
+        it["category"] = cat if cat in CATEGORIES else "other"
+
+    Path(args.out_path).write_bytes(dumps_bytes(doc))
+    known = len(items) - len(todo_positions)
+    print(f"OK: categorized {len(items)} items ({known} via heuristics/cache, {len(batches)} LLM batches)")
     return 0
 
 
@@ -11,15 +11,19 @@ This is intentionally bank-agnostic: colors are keyed by our taxonomy categories
 
 from __future__ import annotations
 
+import functools
 import json
 from pathlib import Path
 
 
+@functools.lru_cache(maxsize=1)
 def _theme_path() -> Path:
     return Path(__file__).resolve().parent.parent / "references" / "chart_theme.json"
 
 
+@functools.lru_cache(maxsize=1)
 def load_theme() -> dict:
+    # Cached: treat the returned dict as read-only.
     return json.loads(_theme_path().read_text(encoding="utf-8"))
 
 
@@ -28,39 +32,64 @@ def category_palette(theme: dict | None = None) -> dict[str, str]:
     return dict(theme.get("category_colors") or {})
 
 
+def _build_rc(ui: dict) -> tuple[dict, dict]:
+    """Seaborn and matplotlib rc dicts for a theme's "ui" colors."""
+
+    sns_rc = {
+        "figure.facecolor": ui.get("bg", "#2F3136"),
+        "axes.facecolor": ui.get("panel", "#26282D"),
+        "axes.edgecolor": ui.get("axes", "#8E94A3"),
+        "axes.labelcolor": ui.get("text_secondary", "#B6BBC6"),
+        "text.color": ui.get("text_primary", "#F2F4F8"),
+        "xtick.color": ui.get("text_secondary", "#B6BBC6"),
+        "ytick.color": ui.get("text_secondary", "#B6BBC6"),
+        "grid.color": ui.get("grid", "#3B3E45"),
+        "grid.linewidth": 0.8,
+        "axes.grid": True,
+        "axes.axisbelow": True,
+        "legend.frameon": False,
+        # no bar outlines
+        "patch.edgecolor": "none",
+        "patch.linewidth": 0,
+    }
+    mpl_rc = {
+        "figure.facecolor": ui.get("bg", "#2F3136"),
+        "savefig.facecolor": ui.get("bg", "#2F3136"),
+        "axes.facecolor": ui.get("panel", "#26282D"),
+        "axes.edgecolor": ui.get("axes", "#8E94A3"),
+        "axes.labelcolor": ui.get("text_secondary", "#B6BBC6"),
+        "text.color": ui.get("text_primary", "#F2F4F8"),
+        "xtick.color": ui.get("text_secondary", "#B6BBC6"),
+        "ytick.color": ui.get("text_secondary", "#B6BBC6"),
+        "grid.color": ui.get("grid", "#3B3E45"),
+        "axes.titlecolor": ui.get("text_primary", "#F2F4F8"),
+        # no bar outlines
+        "patch.edgecolor": "none",
+        "patch.linewidth": 0,
+    }
+    return sns_rc, mpl_rc
+
+
+@functools.lru_cache(maxsize=1)
+def _default_rc() -> tuple[dict, dict]:
+    return _build_rc(load_theme().get("ui") or {})
+
+
 def set_theme(theme: dict | None = None) -> dict:
     """Apply seaborn/matplotlib settings. Returns the theme dict."""
 
-    theme = theme or load_theme()
-    ui = theme.get("ui") or {}
+    if not theme:
+        theme = load_theme()
+        sns_rc, mpl_rc = _default_rc()
+    else:
+        sns_rc, mpl_rc = _build_rc(theme.get("ui") or {})
 
     # Seaborn is the default; fall back gracefully if absent.
     try:
         import seaborn as sns  # type: ignore
 
         # Base seaborn theme
-        sns.set_theme(
-            context="notebook",
-            style="darkgrid",
-            font="DejaVu Sans",
-            rc={
-                "figure.facecolor": ui.get("bg", "#2F3136"),
-                "axes.facecolor": ui.get("panel", "#26282D"),
-                "axes.edgecolor": ui.get("axes", "#8E94A3"),
-                "axes.labelcolor": ui.get("text_secondary", "#B6BBC6"),
-                "text.color": ui.get("text_primary", "#F2F4F8"),
-                "xtick.color": ui.get("text_secondary", "#B6BBC6"),
-                "ytick.color": ui.get("text_secondary", "#B6BBC6"),
-                "grid.color": ui.get("grid", "#3B3E45"),
-                "grid.linewidth": 0.8,
-                "axes.grid": True,
-                "axes.axisbelow": True,
-                "legend.frameon": False,
-                # no bar outlines
-                "patch.edgecolor": "none",
-                "patch.linewidth": 0,
-            },
-        )
+        sns.set_theme(context="notebook", style="darkgrid", font="DejaVu Sans", rc=sns_rc)
     except ModuleNotFoundError:
         pass
 
@@ -68,23 +97,7 @@ def set_theme(theme: dict | None = None) -> dict:
     try:
         import matplotlib as mpl  # type: ignore
 
-        mpl.rcParams.update(
-            {
-                "figure.facecolor": ui.get("bg", "#2F3136"),
-                "savefig.facecolor": ui.get("bg", "#2F3136"),
-                "axes.facecolor": ui.get("panel", "#26282D"),
-                "axes.edgecolor": ui.get("axes", "#8E94A3"),
-                "axes.labelcolor": ui.get("text_secondary", "#B6BBC6"),
-                "text.color": ui.get("text_primary", "#F2F4F8"),
-                "xtick.color": ui.get("text_secondary", "#B6BBC6"),
-                "ytick.color": ui.get("text_secondary", "#B6BBC6"),
-                "grid.color": ui.get("grid", "#3B3E45"),
-                "axes.titlecolor": ui.get("text_primary", "#F2F4F8"),
-                # no bar outlines
-                "patch.edgecolor": "none",
-                "patch.linewidth": 0,
-            }
-        )
+        mpl.rcParams.update(mpl_rc)
     except ModuleNotFoundError:
         pass
 
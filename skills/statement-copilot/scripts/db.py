@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+
+"""Shared SQLite connection for the statement-copilot pipeline.
+
+When ingest runs its steps in-process, every step reuses one connection: PRAGMAs are
+applied once and sqlite3's per-connection statement cache stays warm across inserts.
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+from pathlib import Path
+
+_CONN: sqlite3.Connection | None = None
+
+
+def workspace_dir() -> Path:
+    # OpenClaw agents have a configured workspace; for CLI use, default to repo-relative guess.
+    # Users can override via STATEMENT_COPILOT_WORKSPACE.
+    env = os.getenv("STATEMENT_COPILOT_WORKSPACE")
+    if env:
+        return Path(env).expanduser().resolve()
+
+    # Heuristic: repo lives under <workspace>/tico-open-skills/skills/statement-copilot
+    # so go up 4 levels to reach <workspace>.
+    return Path(__file__).resolve().parents[4]
+
+
+def db_path() -> Path:
+    return workspace_dir() / "data" / "statement-copilot" / "financas.sqlite"
+
+
+def apply_pragmas(conn: sqlite3.Connection) -> None:
+    # WAL: readers (charts) don't block the writer; NORMAL sync is safe under WAL.
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    apply_read_pragmas(conn)
+
+
+def apply_read_pragmas(conn: sqlite3.Connection) -> None:
+    # Per-connection only: safe on read-only connections, never touches the database file.
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA mmap_size=268435456")  # 256 MiB
+    conn.execute("PRAGMA cache_size=-65536")  # 64 MiB
+
+
+def get_conn() -> sqlite3.Connection:
+    """Return the process-wide connection to db_path(), opening it on first use.
+
+    Autocommit mode (isolation_level=None): callers own transaction boundaries via explicit BEGIN.
+    """
+
+    global _CONN
+    if _CONN is None:
+        p = db_path()
+        p.parent.mkdir(parents=True, exist_ok=True)
+        _CONN = sqlite3.connect(p, isolation_level=None, cached_statements=256)
+        apply_pragmas(_CONN)
+    return _CONN
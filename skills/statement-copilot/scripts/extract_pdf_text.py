@@ -3,20 +3,93 @@
 from __future__ import annotations
 
 import argparse
+import io
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+# Below this many pages, worker start-up costs more than it saves.
+PARALLEL_MIN_PAGES = 8
 
-def extract_text(pdf_path: Path, max_pages: int | None = None) -> str:
+
+def page_header(i: int, n: int) -> str:
+    return f"\n\n===== PAGE {i+1}/{n} =====\n"
+
+
+def join_pages(texts, n: int) -> str:
+    """Header + text per page, newline-separated, written into one buffer."""
+
+    buf = io.StringIO()
+    write = buf.write
+    for i, text in enumerate(texts):
+        if i:
+            write("\n")
+        write(page_header(i, n))
+        write("\n")
+        write(text)
+    return buf.getvalue()
+
+
+def _extract_text_pdfplumber(pdf_path: Path, max_pages: int | None = None) -> str:
     import pdfplumber  # type: ignore
 
-    out: list[str] = []
     with pdfplumber.open(str(pdf_path)) as pdf:
         n = len(pdf.pages)
         stop = min(n, max_pages) if max_pages else n
-        for i in range(stop):
-            out.append(f"\n\n===== PAGE {i+1}/{n} =====\n")
-            out.append(pdf.pages[i].extract_text() or "")
-    return "\n".join(out)
+        return join_pages((pdf.pages[i].extract_text() or "" for i in range(stop)), n)
+
+
+def _pdfium_pages(pdf_path: str, indices: range) -> list[str]:
+    import pypdfium2 as pdfium  # type: ignore
+
+    out: list[str] = []
+    pdf = pdfium.PdfDocument(pdf_path)
+    try:
+        for i in indices:
+            page = pdf[i]
+            textpage = page.get_textpage()
+            try:
+                out.append(textpage.get_text_range().replace("\r\n", "\n"))
+            finally:
+                textpage.close()
+                page.close()
+    finally:
+        pdf.close()
+    return out
+
+
+def _extract_one(args: tuple[str, int]) -> str:
+    # Top-level so it can be pickled into worker processes; each worker opens its own handle.
+    pdf_path, i = args
+    return _pdfium_pages(pdf_path, range(i, i + 1))[0]
+
+
+def extract_text(pdf_path: Path, max_pages: int | None = None) -> str:
+    # Prefer PDFium's plain text extraction; pdfplumber builds a full per-character layout
+    # model we don't need. pdfplumber stays as a fallback when pypdfium2 isn't installed.
+    try:
+        import pypdfium2 as pdfium  # type: ignore
+    except ModuleNotFoundError:
+        return _extract_text_pdfplumber(pdf_path, max_pages)
+
+    pdf = pdfium.PdfDocument(str(pdf_path))
+    try:
+        n = len(pdf)
+    finally:
+        pdf.close()
+    stop = min(n, max_pages) if max_pages else n
+
+    if stop < PARALLEL_MIN_PAGES:
+        texts = _pdfium_pages(str(pdf_path), range(stop))
+    else:
+        # Text extraction is CPU-bound per page: spread long statements across cores.
+        # Never fork: callers (ingest) may have threads running, e.g. the sha256 worker.
+        methods = multiprocessing.get_all_start_methods()
+        ctx = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+        with ProcessPoolExecutor(mp_context=ctx) as ex:
+            texts = list(ex.map(_extract_one, [(str(pdf_path), i) for i in range(stop)], chunksize=4))
+
+    return join_pages(texts, n)
 
 
 def main() -> int:
@@ -13,61 +13,96 @@ Design goals:
 from __future__ import annotations
 
 import argparse
+import contextlib
 import hashlib
+import importlib
+import io
 import os
-import sqlite3
+import subprocess
 import sys
+import traceback
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime, timezone
 from pathlib import Path
 
+from db import get_conn, workspace_dir
+
 
 def now_iso() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 
-def sha256_file(path: Path) -> str:
-    h = hashlib.sha256()
-    with path.open("rb") as f:
-        for chunk in iter(lambda: f.read(1024 * 1024), b""):
-            h.update(chunk)
-    return h.hexdigest()
-
+def _sha256():
+    # Content fingerprint, not a security boundary: lets FIPS-restricted builds still
+    # use their fastest (OpenSSL, SHA-NI capable) implementation.
+    return hashlib.new("sha256", usedforsecurity=False)
 
-def workspace_dir() -> Path:
-    # OpenClaw agents have a configured workspace; for CLI use, default to repo-relative guess.
-    # Users can override via STATEMENT_COPILOT_WORKSPACE.
-    env = os.getenv("STATEMENT_COPILOT_WORKSPACE")
-    if env:
-        return Path(env).expanduser().resolve()
 
-    # Heuristic: repo lives under <workspace>/tico-open-skills/skills/statement-copilot
-    # so go up 4 levels to reach <workspace>.
-    return Path(__file__).resolve().parents[4]
+def sha256_file(path: Path) -> str:
+    # Unbuffered reads: file_digest / readinto fill their own buffer, no double copy.
+    with path.open("rb", buffering=0) as f:
+        if hasattr(hashlib, "file_digest"):  # Python 3.11+: hashing loop runs in C
+            return hashlib.file_digest(f, _sha256).hexdigest()
+
+        h = _sha256()
+        buf = bytearray(4 * 1024 * 1024)
+        view = memoryview(buf)
+        while True:
+            n = f.readinto(buf)
+            if not n:
+                break
+            h.update(view[:n])
+        return h.hexdigest()
+
+
+SHA256_XATTR = "user.statement_copilot.sha256"
+
+
+def sha256_cached(path: Path) -> str:
+    """sha256_file, memoized in an extended attribute keyed by size + mtime.
+
+    Re-ingesting an unchanged file skips the full read. Filesystems/platforms
+    without xattr support just hash every time.
+    """
+
+    st = path.stat()
+    stamp = f"{st.st_size}:{st.st_mtime_ns}"
+    getxattr = getattr(os, "getxattr", None)
+    if getxattr is not None:
+        try:
+            cached_stamp, _, h = getxattr(path, SHA256_XATTR).decode("ascii").rpartition(":")
+            if cached_stamp == stamp and len(h) == 64:
+                return h
+        except (OSError, UnicodeDecodeError):
+            pass
+
+    h = sha256_file(path)
+    setxattr = getattr(os, "setxattr", None)
+    if setxattr is not None:
+        try:
+            setxattr(path, SHA256_XATTR, f"{stamp}:{h}".encode("ascii"))
+        except OSError:
+            pass
+    return h
 
 
 def data_dir() -> Path:
     return workspace_dir() / "data" / "statement-copilot"
 
 
-def db_path() -> Path:
-    return data_dir() / "financas.sqlite"
-
-
 def schema_path() -> Path:
     return Path(__file__).resolve().parents[1] / "references" / "schema.sql"
 
 
 def ensure_db() -> None:
     data_dir().mkdir(parents=True, exist_ok=True)
-    p = db_path()
-    conn = sqlite3.connect(p)
-    try:
-        with open(schema_path(), "r", encoding="utf-8") as f:
-            conn.executescript(f.read())
-        conn.commit()
-    finally:
-        conn.close()
+
+    # Shared connection: in-process pipeline steps (insert_sqlite) reuse it.
+    conn = get_conn()
+    # Every statement is IF NOT EXISTS, so re-running is cheap and picks up new indexes.
+    with open(schema_path(), "r", encoding="utf-8") as f:
+        conn.executescript(f.read())
 
 
 @dataclass
@@ -75,6 +110,8 @@ class PdfOpenResult:
     encrypted: bool
     ok: bool
     error: str | None = None
+    # sha256 of the original file, when it had to be computed along the way.
+    sha256: str | None = None
 
 
 def tmp_dir() -> Path:
@@ -85,9 +122,33 @@ def unlocked_pdf_path_for(hash_hex: str) -> Path:
     return tmp_dir() / f"{hash_hex}.unlocked.pdf"
 
 
+ENCRYPT_SCAN_BYTES = 64 * 1024
+
+
+def may_be_encrypted(pdf_path: Path) -> bool:
+    """Cheap pre-check: an encrypted PDF names /Encrypt in a trailer.
+
+    The trailer sits at the end of the file, or near the start for linearized files,
+    so scan both ends. False positives just fall through to the full parse.
+    """
+
+    with pdf_path.open("rb") as f:
+        size = f.seek(0, os.SEEK_END)
+        f.seek(0)
+        if size <= 2 * ENCRYPT_SCAN_BYTES:
+            return b"/Encrypt" in f.read()
+        head = f.read(ENCRYPT_SCAN_BYTES)
+        f.seek(size - ENCRYPT_SCAN_BYTES)
+        tail = f.read()
+    return b"/Encrypt" in head or b"/Encrypt" in tail
+
+
 def ensure_unlocked_pdf(pdf_path: Path, password: str | None) -> tuple[PdfOpenResult, Path]:
     """Return a path that is safe to read (original if not encrypted, else a temp unlocked copy)."""
 
+    if not may_be_encrypted(pdf_path):
+        return (PdfOpenResult(encrypted=False, ok=True), pdf_path)
+
     try:
         from pypdf import PdfReader, PdfWriter  # type: ignore
     except Exception:
@@ -100,7 +161,7 @@ def ensure_unlocked_pdf(pdf_path: Path, password: str | None) -> tuple[PdfOpenRe
             pdf_path,
         )
 
-    reader = PdfReader(str(pdf_path))
+    reader = PdfReader(str(pdf_path), strict=False)
     if not reader.is_encrypted:
         return (PdfOpenResult(encrypted=False, ok=True), pdf_path)
 
@@ -128,20 +189,73 @@ def ensure_unlocked_pdf(pdf_path: Path, password: str | None) -> tuple[PdfOpenRe
 
         # Write unlocked copy (idempotent by sha256)
         tmp_dir().mkdir(parents=True, exist_ok=True)
-        h = sha256_file(pdf_path)
+        h = sha256_cached(pdf_path)
         out = unlocked_pdf_path_for(h)
         if not out.exists():
-            writer = PdfWriter()
-            for page in reader.pages:
-                writer.add_page(page)
+            # Clone the decrypted document as a whole instead of copying page by page.
+            writer = PdfWriter(clone_from=reader)
             with out.open("wb") as f:
                 writer.write(f)
 
-        return (PdfOpenResult(encrypted=True, ok=True), out)
+        return (PdfOpenResult(encrypted=True, ok=True, sha256=h), out)
     except Exception as e:
         return (PdfOpenResult(encrypted=True, ok=False, error=f"Failed to decrypt PDF: {e}"), pdf_path)
 
 
+def run_step(
+    name: str, argv: list[str], in_process: bool = True, check: bool = False
+) -> subprocess.CompletedProcess:
+    """Run a sibling pipeline script (`<name>.py`) and capture its output.
+
+    In-process by default: import the module and call `main(argv)` with stdout/stderr captured,
+    which skips a Python interpreter start + re-imports per step. `in_process=False` spawns
+    `python <name>.py` instead (full isolation). Either way the result looks like subprocess.run's.
+    """
+
+    if not in_process:
+        return subprocess.run(
+            [sys.executable, str(Path(__file__).parent / f"{name}.py"), *argv],
+            check=check,
+            capture_output=True,
+            text=True,
+        )
+
+    out, err = io.StringIO(), io.StringIO()
+    with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+        try:
+            rc = importlib.import_module(name).main(argv)
+        except SystemExit as e:
+            # Mirror the interpreter: SystemExit("msg") prints msg and exits 1.
+            if e.code is None or isinstance(e.code, int):
+                rc = e.code or 0
+            else:
+                print(e.code, file=sys.stderr)
+                rc = 1
+        except Exception:
+            traceback.print_exc()
+            rc = 1
+
+    res = subprocess.CompletedProcess([name, *argv], rc, out.getvalue(), err.getvalue())
+    if check:
+        res.check_returncode()
+    return res
+
+
+def extract_statement_text(readable_path: Path, issuer: str) -> str:
+    from extract_pdf_text import extract_text  # type: ignore
+
+    # Keep prompt size reasonable for LLM-first.
+    # Start with first 3 pages, but if we don't see transaction keywords,
+    # fall back to extracting the full PDF.
+    if issuer.lower() == "nubank":
+        # Nubank PDFs often put the transaction list later (e.g. page 5+).
+        return extract_text(readable_path, max_pages=None)
+    txt = extract_text(readable_path, max_pages=3)
+    if "TRANSA" not in txt.upper() and "LANÇAMENT" not in txt.upper():
+        txt = extract_text(readable_path, max_pages=None)
+    return txt
+
+
 def main() -> int:
     ap = argparse.ArgumentParser()
     ap.add_argument("--issuer", required=True, help="e.g. itau, nubank")
@@ -156,6 +270,11 @@ def main() -> int:
         action="store_true",
         help="Only verify/unlock PDF (no parsing yet).",
     )
+    ap.add_argument(
+        "--subprocess",
+        action="store_true",
+        help="Run each pipeline step in its own Python process (default: in-process).",
+    )
     args = ap.parse_args()
 
     pdf_path = Path(args.file).expanduser().resolve()
@@ -174,7 +293,25 @@ def main() -> int:
         print(f"ERROR: {r.error}", file=sys.stderr)
         return 3
 
-    file_hash = sha256_file(pdf_path)
+    # LLM-first parsing pipeline:
+    # 1) extract PDF text (all pages)
+    # 2) ask OpenClaw agent to return strict JSON
+    # 3) validate, insert into SQLite
+    # 4) print a concise summary
+
+    # Hash on a worker thread (hashlib releases the GIL for large buffers) while the
+    # main thread extracts text, instead of reading the file twice back to back.
+    txt: str | None = None
+    extract_error: Exception | None = None
+    with ThreadPoolExecutor(max_workers=1) as ex:
+        hash_future = None if r.sha256 else ex.submit(sha256_cached, pdf_path)
+        if not args.verify_only:
+            try:
+                txt = extract_statement_text(readable_path, args.issuer)
+            except Exception as e:
+                extract_error = e
+        file_hash = r.sha256 or hash_future.result()
+
     enc = "encrypted" if r.encrypted else "not-encrypted"
     if readable_path != pdf_path:
         print(
@@ -185,27 +322,8 @@ def main() -> int:
     if args.verify_only:
         return 0
 
-    # LLM-first parsing pipeline:
-    # 1) extract PDF text (all pages)
-    # 2) ask OpenClaw agent to return strict JSON
-    # 3) validate, insert into SQLite
-    # 4) print a concise summary
-
-    try:
-        from extract_pdf_text import extract_text  # type: ignore
-
-        # Keep prompt size reasonable for LLM-first.
-        # Start with first 3 pages, but if we don't see transaction keywords,
-        # fall back to extracting the full PDF.
-        if args.issuer.lower() == "nubank":
-            # Nubank PDFs often put the transaction list later (e.g. page 5+).
-            txt = extract_text(readable_path, max_pages=None)
-        else:
-            txt = extract_text(readable_path, max_pages=3)
-            if "TRANSA" not in txt.upper() and "LANÇAMENT" not in txt.upper():
-                txt = extract_text(readable_path, max_pages=None)
-    except Exception as e:
-        print(f"ERROR: failed to extract PDF text: {e}", file=sys.stderr)
+    if extract_error is not None:
+        print(f"ERROR: failed to extract PDF text: {extract_error}", file=sys.stderr)
         return 4
 
     data_dir().mkdir(parents=True, exist_ok=True)
@@ -214,16 +332,14 @@ def main() -> int:
 
     # Call LLM parser
     try:
-        import subprocess, json
-
         json_out = data_dir() / f"{file_hash}.parsed.json"
         post_out = data_dir() / f"{file_hash}.post.json"
         categorized_out = data_dir() / f"{file_hash}.categorized.json"
         session_id = f"statement-copilot-{args.issuer}-{file_hash[:12]}"
-        p = subprocess.run(
+        in_process = not args.subprocess
+        p = run_step(
+            "llm_parse",
             [
-                sys.executable,
-                str(Path(__file__).parent / "llm_parse.py"),
                 "--issuer",
                 args.issuer,
                 "--text-file",
@@ -231,23 +347,19 @@ def main() -> int:
                 "--session-id",
                 session_id,
             ],
+            in_process=in_process,
             check=True,
-            capture_output=True,
-            text=True,
         )
         json_out.write_text(p.stdout.strip() + "\n", encoding="utf-8")
 
         # Validate parse output
-        p2 = subprocess.run(
+        p2 = run_step(
+            "validate_and_summarize",
             [
-                sys.executable,
-                str(Path(__file__).parent / "validate_and_summarize.py"),
                 "--json-file",
                 str(json_out),
             ],
-            check=False,
-            capture_output=True,
-            text=True,
+            in_process=in_process,
         )
         if p2.returncode != 0:
             print("ERROR: LLM output failed validation.", file=sys.stderr)
@@ -257,18 +369,15 @@ def main() -> int:
             return 5
 
         # Post-process (generic, bank-agnostic) to enforce item_type + kind/direction
-        pp = subprocess.run(
+        pp = run_step(
+            "postprocess_items",
             [
-                sys.executable,
-                str(Path(__file__).parent / "postprocess_items.py"),
                 "--in",
                 str(json_out),
                 "--out",
                 str(post_out),
             ],
-            check=False,
-            capture_output=True,
-            text=True,
+            in_process=in_process,
         )
         if pp.returncode != 0:
             print("ERROR: postprocess failed", file=sys.stderr)
@@ -277,10 +386,9 @@ def main() -> int:
             return 10
 
         # Categorize items (LLM-assisted)
-        pc = subprocess.run(
+        pc = run_step(
+            "categorize",
             [
-                sys.executable,
-                str(Path(__file__).parent / "categorize.py"),
                 "--issuer",
                 args.issuer,
                 "--in",
@@ -288,9 +396,7 @@ def main() -> int:
                 "--out",
                 str(categorized_out),
             ],
-            check=False,
-            capture_output=True,
-            text=True,
+            in_process=in_process,
         )
         if pc.returncode != 0:
             print("ERROR: categorization failed", file=sys.stderr)
@@ -300,16 +406,13 @@ def main() -> int:
             return 8
 
         # Validate + summarize categorized output
-        p2c = subprocess.run(
+        p2c = run_step(
+            "validate_and_summarize",
             [
-                sys.executable,
-                str(Path(__file__).parent / "validate_and_summarize.py"),
                 "--json-file",
                 str(categorized_out),
             ],
-            check=False,
-            capture_output=True,
-            text=True,
+            in_process=in_process,
         )
         if p2c.returncode != 0:
             print("ERROR: categorized output failed validation.", file=sys.stderr)
@@ -319,10 +422,9 @@ def main() -> int:
             return 9
 
         # Insert categorized
-        p3 = subprocess.run(
+        p3 = run_step(
+            "insert_sqlite",
             [
-                sys.executable,
-                str(Path(__file__).parent / "insert_sqlite.py"),
                 "--issuer",
                 args.issuer,
                 "--json-file",
@@ -334,9 +436,7 @@ def main() -> int:
                 "--source-hash",
                 file_hash,
             ],
-            check=False,
-            capture_output=True,
-            text=True,
+            in_process=in_process,
         )
         if p3.returncode != 0:
             print("ERROR: failed to insert into SQLite", file=sys.stderr)
@@ -356,6 +456,5 @@ def main() -> int:
         print(e.stderr, file=sys.stderr)
         return 7
 
-
 if __name__ == "__main__":
     raise SystemExit(main())
@@ -4,30 +4,51 @@ from __future__ import annotations
 
 import argparse
 import json
-import os
 import sqlite3
 import uuid
 import hashlib
 from datetime import datetime, timezone
 from pathlib import Path
 
+from db import get_conn
+from jsonio import loads_bytes
+from postprocess_items import normalize_item
+
+# Fixed SQL text: sqlite3 caches prepared statements per connection keyed by the exact string.
+SQL_INSERT_ACCOUNT = "INSERT OR IGNORE INTO accounts (id, issuer, label, home_currency, created_at) VALUES (?,?,?,?,?)"
+SQL_INSERT_SOURCE = "INSERT OR IGNORE INTO sources (id, account_id, source_type, file_path, content_hash, imported_at, metadata_json) VALUES (?,?,?,?,?,?,?)"
+SQL_SELECT_SOURCE = "SELECT id, metadata_json FROM sources WHERE account_id=? AND content_hash=?"
+SQL_UPDATE_SOURCE_METADATA = "UPDATE sources SET metadata_json=? WHERE id=?"
+SQL_SELECT_STATEMENT_BY_SOURCE = "SELECT id FROM statements WHERE source_id=?"
+SQL_SELECT_STATEMENT_BY_PERIOD = "SELECT id FROM statements WHERE account_id=? AND period_start=? AND period_end=?"
+SQL_DELETE_ITEMS = "DELETE FROM statement_items WHERE statement_id=?"
+SQL_UPDATE_STATEMENT = "UPDATE statements SET period_start=?, period_end=?, due_date=?, total_minor=?, currency=?, source_id=?, created_at=? WHERE id=?"
+SQL_INSERT_STATEMENT = "INSERT OR IGNORE INTO statements (id, account_id, period_start, period_end, due_date, total_minor, currency, source_id, created_at) VALUES (?,?,?,?,?,?,?,?,?)"
+SQL_INSERT_ITEM = "INSERT INTO statement_items (id, statement_id, posted_at, description_raw, merchant_norm, amount_minor, currency, direction, kind, installment_n, installment_total, category, orig_amount_minor, orig_currency, fx_rate, fingerprint, created_at) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)"
+
 
 def now_iso() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 
-def workspace_dir() -> Path:
-    env = os.getenv("STATEMENT_COPILOT_WORKSPACE")
-    if env:
-        return Path(env).expanduser().resolve()
-    return Path(__file__).resolve().parents[4]
+def fingerprint_hasher():
+    """128-bit hasher for item fingerprints (dedupe only, not a security boundary).
+
+    Fingerprints are persisted and compared across statements, so always the same stdlib
+    algorithm, regardless of which optional packages are installed.
+    """
 
+    return hashlib.blake2b(digest_size=16)
 
-def db_path() -> Path:
-    return workspace_dir() / "data" / "statement-copilot" / "financas.sqlite"
 
+def item_id(statement_id: str, idx: int) -> str:
+    # Deterministic per (statement, position): re-ingesting into the same statement yields the
+    # same ids, and no per-row urandom read. Keyed on the statement, not the source hash, since
+    # one file can back statements of different accounts.
+    return str(uuid.UUID(bytes=hashlib.blake2b(f"{statement_id}:{idx}".encode("utf-8"), digest_size=16).digest()))
 
-def main() -> int:
+
+def main(argv: list[str] | None = None, conn: sqlite3.Connection | None = None) -> int:
     ap = argparse.ArgumentParser()
     ap.add_argument("--issuer", required=True)
     ap.add_argument("--json-file", required=True)
@@ -35,22 +56,35 @@ def main() -> int:
     ap.add_argument("--source-type", default="pdf")
     ap.add_argument("--source-path", default=None)
     ap.add_argument("--source-hash", default=None, help="sha256 of original file")
-    args = ap.parse_args()
+    ap.add_argument(
+        "--postprocess",
+        action="store_true",
+        help="Normalize items (postprocess_items rules) while inserting, instead of a separate pass",
+    )
+    args = ap.parse_args(argv)
 
-    doc = json.loads(Path(args.json_file).read_text(encoding="utf-8"))
+    raw = Path(args.json_file).read_bytes()
+    doc = loads_bytes(raw)
     st = doc["statement"]
+    # Identifies exactly what this run would write; stored on the source to detect no-op re-runs.
+    import_digest = hashlib.blake2b(raw + (b"|postprocess" if args.postprocess else b""), digest_size=16).hexdigest()
 
     issuer = args.issuer
     account_id = f"acc:{issuer}"  # v0.1: single account per issuer
 
-    conn = sqlite3.connect(db_path())
+    # Shared, already-configured connection unless the caller passes its own.
+    conn = conn or get_conn()
+    # One timestamp for the whole import: every row written below shares it.
+    created = now_iso()
     try:
         cur = conn.cursor()
+        # One write transaction for the whole import (taken up front to avoid lock upgrades).
+        cur.execute("BEGIN IMMEDIATE")
 
         # Upsert account
         cur.execute(
-            "INSERT OR IGNORE INTO accounts (id, issuer, label, home_currency, created_at) VALUES (?,?,?,?,?)",
-            (account_id, issuer, args.account_label or issuer, st.get("currency") or "BRL", now_iso()),
+            SQL_INSERT_ACCOUNT,
+            (account_id, issuer, args.account_label or issuer, st.get("currency") or "BRL", created),
         )
 
         # Upsert source (idempotent by account_id + content_hash)
@@ -60,31 +94,48 @@ def main() -> int:
             source_hash = hashlib.sha256(json.dumps(doc, sort_keys=True).encode("utf-8")).hexdigest()
 
         cur.execute(
-            "INSERT OR IGNORE INTO sources (id, account_id, source_type, file_path, content_hash, imported_at, metadata_json) VALUES (?,?,?,?,?,?,?)",
+            SQL_INSERT_SOURCE,
             (
                 f"src:{issuer}:{source_hash[:16]}",
                 account_id,
                 args.source_type,
                 args.source_path or "(unknown)",
                 source_hash,
-                now_iso(),
+                created,
                 None,
             ),
         )
         cur.execute(
-            "SELECT id FROM sources WHERE account_id=? AND content_hash=?",
+            SQL_SELECT_SOURCE,
             (account_id, source_hash),
         )
-        source_id = cur.fetchone()[0]
+        source_id, source_meta = cur.fetchone()
+
+        # Same source, same input document, statement still linked to it: nothing to rewrite.
+        if source_meta and json.loads(source_meta).get("import_digest") == import_digest:
+            cur.execute(SQL_SELECT_STATEMENT_BY_SOURCE, (source_id,))
+            row = cur.fetchone()
+            if row:
+                conn.commit()
+                print(f"OK: unchanged source_id={source_id} statement_id={row[0]} items={len(st.get('items', []))}")
+                return 0
 
         # Determine period bounds (required by schema). If missing, derive from item dates.
         ps = st.get("period_start")
         pe = st.get("period_end")
         if not ps or not pe:
-            dates = [it.get("posted_at") for it in st.get("items", []) if isinstance(it.get("posted_at"), str) and len(it.get("posted_at")) == 10]
-            if dates:
-                ps = min(dates)
-                pe = max(dates)
+            # One pass, running min/max (ISO dates compare lexicographically).
+            lo = hi = None
+            for it in st.get("items", []):
+                d = it.get("posted_at")
+                if isinstance(d, str) and len(d) == 10:
+                    if lo is None or d < lo:
+                        lo = d
+                    if hi is None or d > hi:
+                        hi = d
+            if lo is not None:
+                ps = lo
+                pe = hi
             else:
                 # last resort: use due_date's month (rough)
                 dd = st.get("due_date")
@@ -93,13 +144,13 @@ def main() -> int:
 
         # Idempotent statement: prefer source_id match; fallback to unique period key.
         statement_id = None
-        cur.execute("SELECT id FROM statements WHERE source_id=?", (source_id,))
+        cur.execute(SQL_SELECT_STATEMENT_BY_SOURCE, (source_id,))
         row = cur.fetchone()
         if row:
             statement_id = row[0]
         else:
             cur.execute(
-                "SELECT id FROM statements WHERE account_id=? AND period_start=? AND period_end=?",
+                SQL_SELECT_STATEMENT_BY_PERIOD,
                 (account_id, ps, pe),
             )
             row = cur.fetchone()
@@ -108,9 +159,9 @@ def main() -> int:
 
         if statement_id:
             # Replace items + refresh header fields
-            cur.execute("DELETE FROM statement_items WHERE statement_id=?", (statement_id,))
+            cur.execute(SQL_DELETE_ITEMS, (statement_id,))
             cur.execute(
-                "UPDATE statements SET period_start=?, period_end=?, due_date=?, total_minor=?, currency=?, source_id=?, created_at=? WHERE id=?",
+                SQL_UPDATE_STATEMENT,
                 (
                     ps,
                     pe,
@@ -118,7 +169,7 @@ def main() -> int:
                     st.get("total_minor"),
                     st.get("currency"),
                     source_id,
-                    now_iso(),
+                    created,
                     statement_id,
                 ),
             )
@@ -126,7 +177,7 @@ def main() -> int:
             statement_id = str(uuid.uuid4())
             # INSERT OR IGNORE to respect unique(account_id, period_start, period_end)
             cur.execute(
-                "INSERT OR IGNORE INTO statements (id, account_id, period_start, period_end, due_date, total_minor, currency, source_id, created_at) VALUES (?,?,?,?,?,?,?,?,?)",
+                SQL_INSERT_STATEMENT,
                 (
                     statement_id,
                     account_id,
@@ -136,62 +187,88 @@ def main() -> int:
                     st.get("total_minor"),
                     st.get("currency"),
                     source_id,
-                    now_iso(),
+                    created,
                 ),
             )
             # If ignored (race/duplicate), fetch existing id
             cur.execute(
-                "SELECT id FROM statements WHERE account_id=? AND period_start=? AND period_end=?",
+                SQL_SELECT_STATEMENT_BY_PERIOD,
                 (account_id, ps, pe),
             )
             statement_id = cur.fetchone()[0]
 
+        # Fingerprint key: issuer|due_date|posted_at|description|amount|currency|direction|kind|inst_n|inst_total.
+        # The statement-level prefix is hashed once; each item copies that state and feeds
+        # its fields as a single encoded string.
+        fp_prefix = fingerprint_hasher()
+        fp_prefix.update(f"{issuer}|{st.get('due_date') or ''}|".encode("utf-8"))
+        fp_currency = st.get("currency") or ""
+
         def fingerprint(it: dict) -> str:
-            parts = [
-                issuer,
-                str(st.get("due_date") or ""),
-                str(it.get("posted_at") or ""),
-                str(it.get("description_raw") or ""),
-                str(it.get("amount_minor") or ""),
-                str(it.get("currency") or st.get("currency") or ""),
-                str(it.get("direction") or ""),
-                str(it.get("kind") or ""),
-                str(it.get("installment_n") or ""),
-                str(it.get("installment_total") or ""),
-            ]
-            return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
-
-        for it in st.get("items", []):
-            item_id = str(uuid.uuid4())
-            fp = fingerprint(it)
-            cur.execute(
-                "INSERT INTO statement_items (id, statement_id, posted_at, description_raw, merchant_norm, amount_minor, currency, direction, kind, installment_n, installment_total, category, orig_amount_minor, orig_currency, fx_rate, fingerprint, created_at) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
+            h = fp_prefix.copy()
+            h.update(
                 (
-                    item_id,
-                    statement_id,
-                    it.get("posted_at"),
-                    it.get("description_raw") or "",
-                    it.get("merchant_norm"),
-                    it.get("amount_minor"),
-                    it.get("currency") or st.get("currency"),
-                    it.get("direction") or "outflow",
-                    it.get("kind") or "purchase",
-                    it.get("installment_n"),
-                    it.get("installment_total"),
-                    it.get("category"),
-                    it.get("orig_amount_minor"),
-                    it.get("orig_currency"),
-                    it.get("fx_rate"),
-                    fp,
-                    now_iso(),
-                ),
+                    f"{it.get('posted_at') or ''}|{it.get('description_raw') or ''}|{it.get('amount_minor') or ''}|"
+                    f"{it.get('currency') or fp_currency}|{it.get('direction') or ''}|{it.get('kind') or ''}|"
+                    f"{it.get('installment_n') or ''}|{it.get('installment_total') or ''}"
+                ).encode("utf-8")
             )
+            return h.hexdigest()
+
+        # Identical lines in one statement (e.g. two equal purchases on the same day) are real
+        # items: keep them distinct under the unique (statement_id, fingerprint) index.
+        seen: dict[str, int] = {}
+
+        def unique_fingerprint(it: dict) -> str:
+            fp = it.get("fingerprint") or fingerprint(it)
+            n = seen.get(fp, 0)
+            seen[fp] = n + 1
+            return f"{fp}#{n}" if n else fp
+
+        items = st.get("items", [])
+        if args.postprocess:
+            # Fused: normalize each item as its row is built (before fingerprinting), no extra JSON round-trip.
+            items_in = map(normalize_item, items)
+        else:
+            items_in = items
+        st_currency = st.get("currency")
+        # Generator: executemany binds and steps each row as it is produced, no row list.
+        rows = (
+            (
+                item_id(statement_id, idx),
+                statement_id,
+                it.get("posted_at"),
+                it.get("description_raw") or "",
+                it.get("merchant_norm"),
+                it.get("amount_minor"),
+                it.get("currency") or st_currency,
+                it.get("direction") or "outflow",
+                it.get("kind") or "purchase",
+                it.get("installment_n"),
+                it.get("installment_total"),
+                it.get("category"),
+                it.get("orig_amount_minor"),
+                it.get("orig_currency"),
+                it.get("fx_rate"),
+                unique_fingerprint(it),
+                created,
+            )
+            for idx, it in enumerate(items_in)
+        )
+        cur.executemany(SQL_INSERT_ITEM, rows)
+        inserted = cur.rowcount
+
+        cur.execute(SQL_UPDATE_SOURCE_METADATA, (json.dumps({"import_digest": import_digest}), source_id))
 
         conn.commit()
-        print(f"OK: upserted source_id={source_id} statement_id={statement_id} items={len(st.get('items', []))}")
+        # Keep planner stats fresh for the report indexes; only re-analyzes when it matters.
+        cur.execute("PRAGMA optimize")
+        print(f"OK: upserted source_id={source_id} statement_id={statement_id} items={inserted}")
         return 0
-    finally:
-        conn.close()
+    except BaseException:
+        if conn.in_transaction:
+            conn.rollback()
+        raise
 
 
 if __name__ == "__main__":
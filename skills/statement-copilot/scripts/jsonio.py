@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+
+"""JSON bytes in/out for the statement-copilot pipeline: orjson when installed, else stdlib json."""
+
+from __future__ import annotations
+
+import json
+
+try:
+    import orjson  # type: ignore
+except ModuleNotFoundError:  # optional: stdlib json fallback
+    orjson = None
+
+
+def loads_bytes(data: bytes):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data.decode("utf-8"))
+
+
+def dumps_bytes(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False).encode("utf-8")
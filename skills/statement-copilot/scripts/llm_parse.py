@@ -11,11 +11,14 @@ No secrets are stored. PDF passwords are never sent to the model.
 from __future__ import annotations
 
 import argparse
+import hashlib
 import json
 import subprocess
 from dataclasses import dataclass
 from pathlib import Path
 
+from db import workspace_dir
+
 
 SYSTEM_PROMPT = """You are a strict JSON extraction engine.
 
@@ -121,12 +124,32 @@ def chunk_text(s: str, max_chars: int = 12000) -> list[str]:
     return chunks
 
 
-def main() -> int:
+def ack_cache_dir() -> Path:
+    return workspace_dir() / "data" / "statement-copilot" / "llm_parse_acks"
+
+
+def chunk_key(session_id: str, idx: int, chunk: str) -> str:
+    """Marker name for "this session already acknowledged this exact chunk at this position".
+
+    Markers are local files; nothing checks that the remote openclaw session still holds the
+    chunk (it may have been reset, compacted or expired), so they are only used with --resume.
+    """
+
+    h = hashlib.blake2b(chunk.encode("utf-8"), digest_size=16).hexdigest()
+    return f"{session_id}-{idx}-{h}"
+
+
+def main(argv: list[str] | None = None) -> int:
     ap = argparse.ArgumentParser()
     ap.add_argument("--issuer", required=True)
     ap.add_argument("--text-file", required=True)
     ap.add_argument("--session-id", default=None)
-    args = ap.parse_args()
+    ap.add_argument(
+        "--resume",
+        action="store_true",
+        help="Skip chunks this session already acknowledged (only safe if the openclaw session was not reset)",
+    )
+    args = ap.parse_args(argv)
 
     text = Path(args.text_file).read_text(encoding="utf-8", errors="replace")
     session_id = args.session_id or f"statement-copilot-{args.issuer}"
@@ -134,10 +157,20 @@ def main() -> int:
     # Prime the session with instructions
     run_openclaw_agent(SYSTEM_PROMPT + f"\n\nISSUER: {args.issuer}", session_id=session_id)
 
-    # Send chunks, require OK
+    # Send chunks, require OK, and record each acknowledged chunk. With --resume, chunks this
+    # session already acknowledged (same position, same content) are skipped. That trusts the
+    # remote session to still hold them: if it was reset/compacted/expired, the final turn runs
+    # without the statement text, so re-runs (usually after a bad parse) send everything by default.
+    acks = ack_cache_dir()
+    acks.mkdir(parents=True, exist_ok=True)
     for idx, ch in enumerate(chunk_text(text), 1):
+        marker = acks / chunk_key(session_id, idx, ch)
+        if args.resume and marker.exists():
+            continue
         msg = f"CHUNK {idx}:\n" + ch + "\n\nReply only OK."
-        run_openclaw_agent(msg, session_id=session_id)
+        ack = run_openclaw_agent(msg, session_id=session_id)
+        if ack.text.strip().upper().startswith("OK"):
+            marker.touch()
 
     # Ask for final JSON
     final = run_openclaw_agent(
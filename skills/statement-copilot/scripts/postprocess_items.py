@@ -16,19 +16,41 @@ This improves:
 from __future__ import annotations
 
 import argparse
-import json
 import re
 from pathlib import Path
 
+from jsonio import dumps_bytes, loads_bytes
 
-RE_PAYMENT = re.compile(r"\b(PAGAMENTO|PAYMENT|PIX)\b", re.I)
-RE_BALANCE = re.compile(r"\b(SALDO|BALANCE|EM\s+ABERTO|EM\s+ATRASO|ATRASO)\b", re.I)
-RE_INTEREST = re.compile(r"\b(JUROS|INTEREST)\b", re.I)
-RE_FEE = re.compile(r"\b(IOF|TARIFA|FEE|ENCARGO|MULTA)\b", re.I)
 
+# Keywords are whole words: split the description into word tokens once and look them up.
+SIGNAL_WORDS = {
+    "payment": frozenset({"PAGAMENTO", "PAYMENT", "PIX"}),
+    # "EM ATRASO" is covered by ATRASO; "EM ABERTO" needs the 2-gram check below.
+    "balance": frozenset({"SALDO", "BALANCE", "ATRASO"}),
+    "interest": frozenset({"JUROS", "INTEREST"}),
+    "fee": frozenset({"IOF", "TARIFA", "FEE", "ENCARGO", "MULTA"}),
+}
+# word -> signal, so a description costs one dict probe per token.
+SIGNAL_BY_WORD = {word: name for name, words in SIGNAL_WORDS.items() for word in words}
+RE_NON_WORD = re.compile(r"\W+")
+RE_EM_ABERTO = re.compile(r"\bEM\s+ABERTO\b")
 
-def decide_item_type(desc: str, kind: str | None) -> str:
-    if RE_PAYMENT.search(desc) or RE_BALANCE.search(desc) or RE_INTEREST.search(desc) or RE_FEE.search(desc):
+
+def signals(desc: str) -> set[str]:
+    """Keyword signals present in a description: subset of {payment, balance, interest, fee}."""
+
+    upper = desc.upper()
+    tokens = frozenset(RE_NON_WORD.split(upper))
+    flags = {SIGNAL_BY_WORD[t] for t in tokens if t in SIGNAL_BY_WORD}
+    if "ABERTO" in tokens and RE_EM_ABERTO.search(upper):
+        flags.add("balance")
+    return flags
+
+
+def decide_item_type(desc: str, kind: str | None, flags: set[str] | None = None) -> str:
+    if flags is None:
+        flags = signals(desc)
+    if flags:
         return "statement_flow"
     # explicit non-spend kinds still flow
     if kind in {"payment", "interest", "fee", "adjustment"}:
@@ -40,28 +62,29 @@ def normalize_item(item: dict) -> dict:
     desc = str(item.get("description_raw") or "")
     kind = item.get("kind")
     direction = item.get("direction")
+    flags = signals(desc)
 
     item_type = item.get("item_type")
     if item_type not in {"transaction", "statement_flow"}:
-        item_type = decide_item_type(desc, kind)
+        item_type = decide_item_type(desc, kind, flags)
 
     # Force obvious mappings
-    if RE_PAYMENT.search(desc):
+    if "payment" in flags:
         kind = "payment"
         direction = "inflow"
         item_type = "statement_flow"
 
-    if RE_INTEREST.search(desc):
+    if "interest" in flags:
         kind = "interest"
         item_type = "statement_flow"
 
-    if RE_FEE.search(desc):
+    if "fee" in flags:
         # keep interest separate if already set
         if kind not in {"interest", "payment"}:
             kind = "fee"
         item_type = "statement_flow"
 
-    if RE_BALANCE.search(desc):
+    if "balance" in flags:
         # carried/late balances usually increase what you owe
         if kind not in {"payment"}:
             kind = kind or "adjustment"
@@ -81,13 +104,13 @@ def normalize_item(item: dict) -> dict:
     return item
 
 
-def main() -> int:
+def main(argv: list[str] | None = None) -> int:
     ap = argparse.ArgumentParser()
     ap.add_argument("--in", dest="in_path", required=True)
     ap.add_argument("--out", dest="out_path", required=True)
-    args = ap.parse_args()
+    args = ap.parse_args(argv)
 
-    doc = json.loads(Path(args.in_path).read_text(encoding="utf-8"))
+    doc = loads_bytes(Path(args.in_path).read_bytes())
     st = doc.get("statement")
     items = st.get("items") if isinstance(st, dict) else None
     if not isinstance(items, list):
@@ -95,7 +118,7 @@ def main() -> int:
 
     st["items"] = [normalize_item(it) for it in items]
 
-    Path(args.out_path).write_text(json.dumps(doc, ensure_ascii=False), encoding="utf-8")
+    Path(args.out_path).write_bytes(dumps_bytes(doc))
     print(f"OK: postprocessed {len(items)} items")
     return 0
 
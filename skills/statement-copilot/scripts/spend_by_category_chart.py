@@ -15,7 +15,7 @@ import argparse
 import sqlite3
 from pathlib import Path
 
-from chart_theme import set_theme, category_palette
+from db import apply_read_pragmas
 
 
 def parse_month(s: str) -> tuple[str, str]:
@@ -34,11 +34,14 @@ def parse_month(s: str) -> tuple[str, str]:
     return start, end
 
 
+# en-US -> pt-BR separators in one pass: "," <-> "."
+_BR_SEPARATORS = str.maketrans(",.", ".,")
+
+
 def fmt_brl(minor: int) -> str:
     v = minor / 100.0
     # BR formatting without locale deps
-    s = f"{v:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-    return f"R$ {s}"
+    return f"R$ {f'{v:,.2f}'.translate(_BR_SEPARATORS)}"
 
 
 def main() -> int:
@@ -69,11 +72,15 @@ def main() -> int:
         action="store_true",
         help="Hide X axis ticks/labels/spine (recommended for minimalist charts)",
     )
+    ap.add_argument("--dpi", type=int, default=180, help="PNG resolution (lower renders faster, e.g. 90 for thumbnails)")
     args = ap.parse_args()
 
     start, end = parse_month(args.month)
 
-    conn = sqlite3.connect(args.db)
+    # Read-only: a mistyped --db fails instead of creating an empty database, and the chart
+    # never changes the file (e.g. its journal mode). Under WAL the read still never blocks an ingest.
+    conn = sqlite3.connect(Path(args.db).expanduser().resolve().as_uri() + "?mode=ro", uri=True)
+    apply_read_pragmas(conn)
     conn.row_factory = sqlite3.Row
     cur = conn.cursor()
 
@@ -102,6 +109,13 @@ def main() -> int:
     if not rows:
         raise SystemExit("No rows for that month")
 
+    # Plotting stack (theme -> seaborn/matplotlib) only once there is something to draw.
+    import matplotlib  # type: ignore
+
+    # PNG output only: pick Agg before seaborn/pyplot load, skipping GUI backend probing.
+    matplotlib.use("Agg")
+    from chart_theme import set_theme, category_palette
+
     theme = set_theme()
     ui = theme.get("ui") or {}
     accents = theme.get("accents") or {}
@@ -127,21 +141,22 @@ def main() -> int:
             cats.append("other")
             vals.append(rest_minor)
 
-    import pandas as pd  # type: ignore
     import seaborn as sns  # type: ignore
     import matplotlib.pyplot as plt  # type: ignore
 
-    df = pd.DataFrame({"category": cats, "total_minor": vals})
+    # A handful of bars: plain lists, no DataFrame.
     # Ensure bars are always ordered by spend (desc), even after merging "other".
-    df = df.sort_values("total_minor", ascending=False).reset_index(drop=True)
+    order = sorted(range(len(cats)), key=lambda i: vals[i], reverse=True)
+    cats = [cats[i] for i in order]
+    vals = [vals[i] for i in order]
 
-    df["pct"] = df["total_minor"].map(lambda v: (v / total_minor_all) if total_minor_all else 0.0)
-    df["label"] = df.apply(lambda r: f"{fmt_brl(int(r.total_minor))}  ({r.pct*100:.0f}%)", axis=1)
+    pcts = [(v / total_minor_all) if total_minor_all else 0.0 for v in vals]
+    labels = [f"{fmt_brl(v)}  ({p*100:.0f}%)" for v, p in zip(vals, pcts)]
 
     # highlight decision
     highlight = args.highlight
     if highlight == "top1":
-        highlight = df.iloc[0]["category"]
+        highlight = cats[0]
 
     accent = accents.get("primary", "#22D3EE")
     mono = ui.get("mono_bar", "#B6BBC6")
@@ -149,20 +164,18 @@ def main() -> int:
 
     if args.style == "mono":
         # Default: monochrome bars; one accent highlight.
-        df["color"] = df["category"].map(lambda c: accent if c == highlight else mono_dim)
         # Keep grouped "other" slightly dimmer but not black.
-        df.loc[df["category"] == "other", "color"] = mono_dim
+        colors = [accent if c == highlight and c != "other" else mono_dim for c in cats]
     else:
-        df["color"] = df["category"].map(lambda c: palette.get(c, palette.get("other", mono_dim)))
+        colors = [palette.get(c, palette.get("other", mono_dim)) for c in cats]
 
     # seaborn: avoid deprecated palette usage by using hue
     fig, ax = plt.subplots(figsize=(10, 6))
     sns.barplot(
-        data=df,
-        y="category",
-        x="total_minor",
-        hue="category",
-        palette=dict(zip(df["category"].tolist(), df["color"].tolist())),
+        y=cats,
+        x=vals,
+        hue=cats,
+        palette=dict(zip(cats, colors)),
         dodge=False,
         legend=False,
         errorbar=None,  # disable confidence interval line
@@ -199,7 +212,7 @@ def main() -> int:
         xmax = max(vals) if vals else 0
         # Extend the plotting area so right-side labels stay inside the panel.
         ax.set_xlim(0, max(1, xmax) * 1.32)
-        for i, (v, label) in enumerate(zip(df["total_minor"].tolist(), df["label"].tolist())):
+        for i, (v, label) in enumerate(zip(vals, labels)):
             ax.text(
                 v + max(1, xmax) * 0.02,
                 i,
@@ -219,7 +232,8 @@ def main() -> int:
     out = Path(args.out)
     out.parent.mkdir(parents=True, exist_ok=True)
     fig.tight_layout()
-    fig.savefig(out, dpi=180)
+    fig.savefig(out, dpi=args.dpi)
+    plt.close(fig)
     print(f"OK: wrote {out}")
     return 0
 
@@ -3,19 +3,81 @@
 from __future__ import annotations
 
 import argparse
-import json
+import contextlib
+import functools
+import heapq
 import re
+import sys
+from collections import Counter
 from dataclasses import dataclass
+from itertools import islice
+from operator import itemgetter
 from pathlib import Path
 
-
-ALLOWED_DIRECTIONS = {"inflow", "outflow"}
-ALLOWED_KINDS = {"purchase", "refund", "fee", "interest", "adjustment", "payment"}
-ALLOWED_ITEM_TYPES = {"transaction", "statement_flow"}
+from jsonio import loads_bytes
+
+
+MAX_CHECKED_ITEMS = 5000
+MAX_ERRORS = 200
+
+# frozensets even for the 2-element ones: parsed JSON values are not interned, so a tuple
+# scan falls back to string compares while the set probe uses the cached str hash.
+ALLOWED_DIRECTIONS = frozenset({"inflow", "outflow"})
+ALLOWED_KINDS = frozenset({"purchase", "refund", "fee", "interest", "adjustment", "payment"})
+ALLOWED_ITEM_TYPES = frozenset({"transaction", "statement_flow"})
+
+
+# Compiled fast path for validate(). Kept at least as strict as the hand-written checks
+# (draft-04: 1.0/true are not integers), so a pass here is always a pass there.
+_ISO_DATE_OR_NULL = {"type": ["string", "null"], "pattern": r"^\d{4}-\d{2}-\d{2}\Z"}
+_ISO_4217 = {"type": "string", "minLength": 3, "maxLength": 3}
+STATEMENT_SCHEMA = {
+    "$schema": "http://json-schema.org/draft-04/schema#",
+    "type": "object",
+    "required": ["statement"],
+    "properties": {
+        "statement": {
+            "type": "object",
+            "required": ["issuer", "currency", "total_minor", "items"],
+            "properties": {
+                "currency": _ISO_4217,
+                "total_minor": {"type": "integer"},
+                "period_start": _ISO_DATE_OR_NULL,
+                "period_end": _ISO_DATE_OR_NULL,
+                "due_date": _ISO_DATE_OR_NULL,
+                "items": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "required": ["amount_minor", "currency", "direction", "kind"],
+                        "properties": {
+                            "amount_minor": {"type": "integer"},
+                            "currency": _ISO_4217,
+                            "item_type": {"enum": sorted(ALLOWED_ITEM_TYPES) + [None]},
+                            "direction": {"enum": sorted(ALLOWED_DIRECTIONS)},
+                            "kind": {"enum": sorted(ALLOWED_KINDS)},
+                            "posted_at": _ISO_DATE_OR_NULL,
+                        },
+                    },
+                },
+            },
+        },
+    },
+}
+
+try:
+    import fastjsonschema  # type: ignore
+except ModuleNotFoundError:  # optional: hand-written checks only
+    fastjsonschema = None
+
+_FAST_VALIDATE = fastjsonschema.compile(STATEMENT_SCHEMA) if fastjsonschema is not None else None
+
+
+_ISO_DATE_FULLMATCH = re.compile(r"\d{4}-\d{2}-\d{2}").fullmatch
 
 
 def is_iso_date(s: str) -> bool:
-    return bool(re.fullmatch(r"\d{4}-\d{2}-\d{2}", s))
+    return _ISO_DATE_FULLMATCH(s) is not None
 
 
 @dataclass
@@ -25,9 +87,17 @@ class ValidationResult:
 
 
 def validate(doc: dict) -> ValidationResult:
+    if _FAST_VALIDATE is not None:
+        try:
+            _FAST_VALIDATE(doc)
+            return ValidationResult(ok=True, errors=[])
+        except fastjsonschema.JsonSchemaException:
+            pass  # fall through: the checks below report every problem, not just the first
+
     errors: list[str] = []
 
-    st = (doc or {}).get("statement")
+    # A JSON array/string/number is a parse "success" too: reject it here, not with an AttributeError.
+    st = doc.get("statement") if isinstance(doc, dict) else None
     if not isinstance(st, dict):
         return ValidationResult(False, ["missing statement object"])
 
@@ -45,7 +115,7 @@ def validate(doc: dict) -> ValidationResult:
 
     for d in ("period_start", "period_end", "due_date"):
         v = st.get(d)
-        if v is not None and (not isinstance(v, str) or not is_iso_date(v)):
+        if v is not None and (not isinstance(v, str) or _ISO_DATE_FULLMATCH(v) is None):
             errors.append(f"statement.{d} must be YYYY-MM-DD or null")
 
     items = st.get("items")
@@ -53,7 +123,9 @@ def validate(doc: dict) -> ValidationResult:
         errors.append("statement.items must be list")
         items = []
 
-    for i, it in enumerate(items[:5000]):
+    for i, it in enumerate(islice(items, MAX_CHECKED_ITEMS)):
+        if len(errors) >= MAX_ERRORS:
+            break  # main() prints the first 50; a doc this broken needs no more detail
         if not isinstance(it, dict):
             errors.append(f"item[{i}] not object")
             continue
@@ -73,12 +145,24 @@ def validate(doc: dict) -> ValidationResult:
         if kd not in ALLOWED_KINDS:
             errors.append(f"item[{i}].kind invalid")
         pd = it.get("posted_at")
-        if pd is not None and (not isinstance(pd, str) or not is_iso_date(pd)):
+        if pd is not None and (not isinstance(pd, str) or _ISO_DATE_FULLMATCH(pd) is None):
             errors.append(f"item[{i}].posted_at must be YYYY-MM-DD or null")
 
     return ValidationResult(ok=(len(errors) == 0), errors=errors)
 
 
+# "," <-> "." (en-US -> pt-BR separators)
+_BR_SEPARATORS = str.maketrans(",.", ".,")
+
+
+@functools.lru_cache(maxsize=1024)
+def fmt_minor(x: int) -> str:
+    # en-US to pt-BR-ish, one pass
+    s = f"{abs(x)/100:,.2f}".translate(_BR_SEPARATORS)
+    sign = "-" if x < 0 else ""
+    return sign + s
+
+
 def summarize(doc: dict) -> str:
     st = doc["statement"]
     items = st.get("items", [])
@@ -87,33 +171,35 @@ def summarize(doc: dict) -> str:
     currency = st.get("currency")
     due = st.get("due_date")
 
-    def fmt_minor(x: int) -> str:
-        s = f"{abs(x)/100:,.2f}"
-        # en-US to pt-BR-ish
-        s = s.replace(",", "X").replace(".", ",").replace("X", ".")
-        sign = "-" if x < 0 else ""
-        return sign + s
-
-    def is_tx(it: dict) -> bool:
-        # Default to transaction if field missing (backward compatibility)
-        return it.get("item_type", "transaction") == "transaction"
-
-    tx_items = [it for it in items if isinstance(it, dict) and is_tx(it)]
-    flow_items = [it for it in items if isinstance(it, dict) and not is_tx(it)]
+    # One pass over items: expenses + category rollup (transactions) and flows.
+    # item_type defaults to transaction if missing (backward compatibility).
+    # Amounts are read once per item and carried as (amount, item) pairs.
+    expenses: list[tuple[int, dict]] = []
+    cat_totals: Counter[str] = Counter()
+    flows: list[tuple[int, dict]] = []
+    has_flows = False
+    for it in items:
+        if not isinstance(it, dict):
+            continue
+        amt = it.get("amount_minor")
+        if it.get("item_type", "transaction") == "transaction":
+            if it.get("direction") == "outflow" and isinstance(amt, int):
+                amt = int(amt)
+                expenses.append((amt, it))
+                cat = it.get("category") or "uncategorized"
+                if not isinstance(cat, str):
+                    cat = "uncategorized"
+                cat_totals[cat] += amt
+        else:
+            has_flows = True
+            if isinstance(amt, int):
+                flows.append((int(amt), it))
 
     # top 5 expenses (transactions only)
-    expenses = [it for it in tx_items if it.get("direction") == "outflow" and isinstance(it.get("amount_minor"), int)]
-    expenses_sorted = sorted(expenses, key=lambda it: it.get("amount_minor", 0), reverse=True)
-    top = expenses_sorted[:5]
+    top = heapq.nlargest(5, expenses, key=itemgetter(0))
 
     # category rollup (top 6 by spend) - transactions only
-    cat_totals: dict[str, int] = {}
-    for it in expenses:
-        cat = it.get("category") or "uncategorized"
-        if not isinstance(cat, str):
-            cat = "uncategorized"
-        cat_totals[cat] = cat_totals.get(cat, 0) + int(it.get("amount_minor"))
-    top_cats = sorted(cat_totals.items(), key=lambda kv: kv[1], reverse=True)[:6]
+    top_cats = cat_totals.most_common(6)
 
     lines = []
     lines.append(f"Issuer: {st.get('issuer')}")
@@ -127,35 +213,28 @@ def summarize(doc: dict) -> str:
         lines.append("")
 
     lines.append("Top expenses (transactions):")
-    for it in top:
+    for amt, it in top:
         cat = it.get("category") or "uncategorized"
         lines.append(
-            f"- {it.get('posted_at')} | {it.get('description_raw')} | {cat} | {it.get('currency')} {fmt_minor(int(it.get('amount_minor')))}"
+            f"- {it.get('posted_at')} | {it.get('description_raw')} | {cat} | {it.get('currency') or currency} {fmt_minor(amt)}"
         )
 
     # Show a small summary of statement flows
-    if flow_items:
+    if has_flows:
         lines.append("")
         lines.append("Statement flows (top 5 by absolute value):")
-        flows_sorted = sorted(
-            [it for it in flow_items if isinstance(it.get('amount_minor'), int)],
-            key=lambda it: abs(int(it.get('amount_minor'))),
-            reverse=True,
-        )[:5]
-        for it in flows_sorted:
+        flows_sorted = heapq.nlargest(5, flows, key=lambda p: abs(p[0]))
+        for amt, it in flows_sorted:
             lines.append(
-                f"- {it.get('posted_at')} | {it.get('description_raw')} | {it.get('kind')} | {it.get('direction')} | {it.get('currency')} {fmt_minor(int(it.get('amount_minor')))}"
+                f"- {it.get('posted_at')} | {it.get('description_raw')} | {it.get('kind')} | {it.get('direction')} | {it.get('currency') or currency} {fmt_minor(amt)}"
             )
 
     return "\n".join(lines)
 
 
-def main() -> int:
-    ap = argparse.ArgumentParser()
-    ap.add_argument("--json-file", required=True)
-    args = ap.parse_args()
+def report(doc) -> int:
+    """Print the summary (or INVALID + errors) for one document; return its exit code."""
 
-    doc = json.loads(Path(args.json_file).read_text(encoding="utf-8"))
     vr = validate(doc)
     if not vr.ok:
         print("INVALID")
@@ -167,5 +246,40 @@ def main() -> int:
     return 0
 
 
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser()
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("--json-file")
+    src.add_argument(
+        "--jsonl",
+        help="Batch mode: one statement document per line ('-' for stdin); reports are separated by a form feed",
+    )
+    args = ap.parse_args(argv)
+
+    if args.json_file:
+        return report(loads_bytes(Path(args.json_file).read_bytes()))
+
+    # One process (and one compiled validator) for many documents.
+    rc = 0
+    first = True
+    with (contextlib.nullcontext(sys.stdin.buffer) if args.jsonl == "-" else open(args.jsonl, "rb")) as f:
+        for n, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            if not first:
+                print("\f")
+            first = False
+            try:
+                doc = loads_bytes(line)
+            except ValueError:  # json/orjson.JSONDecodeError, bad UTF-8
+                # One bad line fails that document only, not the rest of the batch.
+                print("INVALID")
+                print(f"- line {n}: not valid JSON")
+                rc = 2
+                continue
+            rc = max(rc, report(doc))
+    return rc
+
+
 if __name__ == "__main__":
     raise SystemExit(main())
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import contextlib
+import io
+import json
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+import validate_and_summarize  # noqa: E402
+
+VALID = {
+    "statement": {
+        "issuer": "itau",
+        "currency": "BRL",
+        "total_minor": 1000,
+        "items": [
+            {
+                "item_type": "transaction",
+                "posted_at": "2026-01-05",
+                "description_raw": "PADARIA",
+                "amount_minor": 1000,
+                "currency": "BRL",
+                "direction": "outflow",
+                "kind": "purchase",
+            }
+        ],
+    }
+}
+
+
+def run_jsonl(lines: list[str]) -> tuple[int, str]:
+    with tempfile.NamedTemporaryFile("w", suffix=".jsonl", delete=False, encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    out = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(out):
+            rc = validate_and_summarize.main(["--jsonl", f.name])
+    finally:
+        Path(f.name).unlink()
+    return rc, out.getvalue()
+
+
+class JsonlBatchTest(unittest.TestCase):
+    def test_bad_lines_do_not_abort_the_batch(self):
+        valid = json.dumps(VALID)
+        rc, out = run_jsonl([valid, "{bad", "[1]", '"x"', "5", valid])
+
+        self.assertEqual(rc, 2)
+        reports = out.split("\f")
+        self.assertEqual(len(reports), 6)
+        self.assertIn("Issuer: itau", reports[0])
+        self.assertIn("INVALID", reports[1])
+        self.assertIn("- line 2: not valid JSON", reports[1])
+        for r in reports[2:5]:
+            self.assertIn("INVALID", r)
+            self.assertIn("- missing statement object", r)
+        self.assertIn("Issuer: itau", reports[5])
+
+    def test_valid_batch_exits_zero(self):
+        rc, out = run_jsonl([json.dumps(VALID)])
+        self.assertEqual(rc, 0)
+        self.assertNotIn("INVALID", out)
+
+
+class ValidateTest(unittest.TestCase):
+    def test_non_object_document(self):
+        for doc in ([1], "x", 5, None):
+            vr = validate_and_summarize.validate(doc)
+            self.assertFalse(vr.ok)
+            self.assertEqual(vr.errors, ["missing statement object"])
+
+
+if __name__ == "__main__":
+    unittest.main()